@@ -1,15 +1,31 @@
 import streamlit as st
 from database import Database
+from material_stats import MaterialStats
+from shared_cache import SharedCache
+from outbox import OutboxFlusher
+from prefetch import Prefetcher
+import export
+from geocoding import Geocoder, GazetteerBackend, NominatimBackend
+from location_import import import_locations, read_location_rows
+import instrumentation
 import pandas as pd
 from datetime import datetime, timedelta
 import os
 import time
 import json
+import threading
+import uuid
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import folium
-from streamlit_folium import st_folium
+import streamlit.components.v1 as components
 
-# Initialize database
-db = Database()
+@st.cache_resource
+def get_database():
+    """Database shared by all sessions; each script thread gets its own pooled connection"""
+    return Database()
+
+db = get_database()
 
 # Initialize session state
 if 'materials' not in st.session_state:
@@ -22,15 +38,6 @@ if 'profile' not in st.session_state:
 if 'contractors' not in st.session_state:
     st.session_state.contractors = {}
 
-# Add caching for spreadsheet data
-if 'cache' not in st.session_state:
-    st.session_state.cache = {
-        'spreadsheet': None,
-        'last_refresh': None,
-        'materials': None,
-        'materials_last_refresh': None
-    }
-
 # Add to session state initialization at the top
 if 'project_locations' not in st.session_state:
     st.session_state.project_locations = {}
@@ -63,11 +70,12 @@ try:
     import gspread
     from google.oauth2.service_account import Credentials
     from google.oauth2 import service_account
-    from googleapiclient.discovery import build
+    from google.auth.transport.requests import Request as GoogleAuthRequest
+    from sheets_client import rate_limited, is_rate_limited, get_quota_remaining, RevisionTracker
 except ImportError:
     st.error("""
         Missing required packages. Please run:
-        pip install gspread google-auth google-api-python-client
+        pip install gspread google-auth
     """)
     st.stop()
 
@@ -78,6 +86,43 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive.file'
 ]
 
+# How often the spreadsheet's Drive modifiedTime is checked. The sheet mirror
+# and materials list are only re-read from Sheets after it changes, so edits
+# made in Google Sheets show up within this long.
+REVISION_CHECK_INTERVAL = timedelta(seconds=5)
+# Fallbacks for when Drive can't be reached and the revision is unknown
+MIRROR_SYNC_INTERVAL = timedelta(minutes=1)
+MATERIALS_CACHE_TTL = timedelta(minutes=5)
+# A sync reads only the rows from a sheet's last mirrored row down, which shows
+# rows added, deleted or moved; edits in place only show in a full read, made
+# at most this often per sheet, and only once the spreadsheet has changed
+MIRROR_VERIFY_INTERVAL = timedelta(minutes=30)
+
+# Project dashboard: sheets synced per request, and requests in flight at once
+DASHBOARD_SYNC_BATCH = 10
+DASHBOARD_WORKERS = 4
+
+# Blank rows the bulk entry grid starts with; more can be added
+BULK_ENTRY_ROWS = 20
+
+# Bid history is shown one page at a time, sorted in the database
+BID_HISTORY_PAGE_SIZE = 50
+BID_HISTORY_SORTS = {
+    "Newest first": ("Date", True),
+    "Oldest first": ("Date", False),
+    "Highest total": ("Total", True),
+    "Lowest total": ("Total", False),
+    "Contractor": ("Contractor", False),
+    "Material": ("Material", False)
+}
+
+# Sheet headers
+MASTER_HEADERS = ["Date", "Contractor", "Project Name", "Project Owner", 
+                  "Location", "Unit Number", "Material", "Unit", 
+                  "Quantity", "Price", "Total", "Bid ID"]
+PROJECT_HEADERS = ["Date", "Contractor", "Location", "Unit Number",
+                   "Material", "Unit", "Quantity", "Price", "Total", "Bid ID"]
+
 # Default units
 DEFAULT_UNITS = ["SF", "SY", "LF", "Unit"]
 
@@ -138,10 +183,7 @@ def get_or_create_spreadsheet(sheets_client):
         # Set up Master Sheet
         master_sheet = spreadsheet.sheet1
         master_sheet.update_title("Master Sheet")
-        headers = ["Date", "Contractor", "Project Name", "Project Owner", 
-                  "Location", "Unit Number", "Material", "Unit", 
-                  "Quantity", "Price", "Total"]
-        master_sheet.append_row(headers)
+        master_sheet.append_row(MASTER_HEADERS)
         
         # Set up Materials Sheet
         materials_sheet = spreadsheet.add_worksheet("Materials", 1000, 2)
@@ -161,28 +203,26 @@ def get_or_create_spreadsheet(sheets_client):
         st.error(f"Error with spreadsheet: {str(e)}")
         return None
 
+@st.cache_resource
+def get_shared_cache():
+    """Spreadsheet handle, sheet ids, worksheets and materials shared by all sessions"""
+    return SharedCache()
+
+@instrumentation.traced
 def get_spreadsheet(sheets_client):
     try:
-        # Use cached spreadsheet if available and less than 1 minute old
-        if (st.session_state.cache['spreadsheet'] and 
-            st.session_state.cache['last_refresh'] and 
-            datetime.now() - st.session_state.cache['last_refresh'] < timedelta(minutes=1)):
-            return st.session_state.cache['spreadsheet']
-            
         # Use the permanent spreadsheet ID
         SPREADSHEET_ID = "1_VpKh9Ha-43jUFeYyVljAmSCszay_ChD9jiWAbW_jEU"
         
         try:
-            time.sleep(1)  # Add delay to prevent quota issues
-            spreadsheet = sheets_client.open_by_key(SPREADSHEET_ID)
-            
-            # Update cache
-            st.session_state.cache['spreadsheet'] = spreadsheet
-            st.session_state.cache['last_refresh'] = datetime.now()
-            
-            return spreadsheet
+            # The handle holds no sheet data, so it stays valid until the client is rebuilt
+            return get_shared_cache().get(
+                ('spreadsheet', SPREADSHEET_ID),
+                lambda: sheets_client.open_by_key(SPREADSHEET_ID),
+                revision=sheets_client
+            )
         except Exception as e:
-            if "429" in str(e):
+            if is_rate_limited(e):
                 st.error("Rate limit reached. Please wait a moment and try again.")
             else:
                 st.error(f"Error opening spreadsheet: {str(e)}")
@@ -192,29 +232,505 @@ def get_spreadsheet(sheets_client):
         st.error(f"Error with spreadsheet: {str(e)}")
         return None
 
+@st.cache_resource
+def get_revision_tracker():
+    """Spreadsheet revisions shared by all sessions"""
+    return RevisionTracker()
+
+def get_spreadsheet_revision(spreadsheet):
+    """The spreadsheet's last modified time, or None if it couldn't be checked"""
+    return get_revision_tracker().get(spreadsheet, REVISION_CHECK_INTERVAL.total_seconds())
+
+def sync_sheet_mirror(spreadsheet, sheet_name, force=False):
+    """Bring the local mirror of a worksheet up to date with its rows in Sheets"""
+    return sync_sheet_mirrors(spreadsheet, [sheet_name], force)
+
+@instrumentation.traced
+def sync_sheet_mirrors(spreadsheet, sheet_names, force=False):
+    """Bring the mirror of several worksheets up to date with one values_batch_get
+    
+    Sheets mirrored at the spreadsheet's current revision are left alone, so
+    nothing is read until the spreadsheet changes. If the revision can't be
+    checked, mirrors older than MIRROR_SYNC_INTERVAL are synced instead.
+    """
+    try:
+        revision, stale = get_stale_mirrors(spreadsheet, sheet_names, force)
+        if stale:
+            fetch_sheet_mirrors(spreadsheet, stale, revision)
+        return True
+    except Exception as e:
+        st.error(f"Error syncing {', '.join(sheet_names)}: {str(e)}")
+        return False
+
+def get_stale_mirrors(spreadsheet, sheet_names, force=False):
+    """The spreadsheet revision and the sheets whose mirror is behind it"""
+    revision = get_spreadsheet_revision(spreadsheet)
+    stale = [
+        name for name in sheet_names
+        if force or not mirror_is_current(db.get_sheet_sync_state(name), revision)
+    ]
+    for name in sheet_names:
+        instrumentation.record_cache('sheet_mirror', name not in stale)
+    return revision, stale
+
+def fetch_sheet_mirrors(spreadsheet, sheet_names, revision, verify=False):
+    """Read the new rows of sheet_names into the mirror with one values_batch_get
+    
+    Sheets not compared in full for MIRROR_VERIFY_INTERVAL, or all of them
+    if verify is set, are read whole so edits made in place are found too.
+    Raises if the read fails, and makes no st calls, so it can run on a
+    worker thread.
+    """
+    states = {name: db.get_sheet_sync_state(name) for name in sheet_names}
+    now = datetime.now()
+    full = [name for name in sheet_names if states[name] and (verify or not mirror_recently_verified(states[name], now))]
+    # Other sheets are fetched from their last known row down; starting on a
+    # row we already have keeps the range inside the grid when none were added
+    response = spreadsheet.values_batch_get([
+        gspread.utils.absolute_range_name(name) if name in full else get_sheet_tail_range(name, states[name])
+        for name in sheet_names
+    ])
+    moved = []
+    for name, value_range in zip(sheet_names, response.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        if name in full:
+            if not mirror_sheet_values(name, states[name], values):
+                raise RuntimeError(f"Could not mirror {name}")
+        elif not store_sheet_values(name, states[name], values) and states[name]:
+            moved.append(name)
+    if moved:
+        # Rows were deleted or inserted above the tail, so those sheets are read in full
+        response = spreadsheet.values_batch_get([gspread.utils.absolute_range_name(name) for name in moved])
+        for name, value_range in zip(moved, response.get('valueRanges', [])):
+            if not mirror_sheet_values(name, states[name], value_range.get('values', [])):
+                raise RuntimeError(f"Could not mirror {name}")
+    # A first sync reads the whole sheet too
+    db.set_sheet_verified(full + moved + [name for name in sheet_names if not states[name]], now)
+    # The revision was read before the values, so a change made in between
+    # leaves the mirror behind the next revision and it syncs again
+    if revision:
+        db.set_sheet_revision(sheet_names, revision)
+
+def mirror_recently_verified(state, now):
+    """Whether a sheet's mirror was compared in full with Sheets within MIRROR_VERIFY_INTERVAL"""
+    return bool(state['verified'] and now - state['verified'] < MIRROR_VERIFY_INTERVAL)
+
+def current_mirrors(spreadsheet, sheet_names):
+    """Sheets whose mirror is at the spreadsheet's revision, checked before the app writes to them"""
+    revision = get_spreadsheet_revision(spreadsheet)
+    if not revision:
+        return []
+    current = []
+    for name in sheet_names:
+        state = db.get_sheet_sync_state(name)
+        if state and state['revision'] == revision:
+            current.append(name)
+    return current
+
+def record_own_write(spreadsheet, sheet_names):
+    """Move mirrors the app just wrote through to the revision its write created
+    
+    sheet_names must have been current before the write (see
+    current_mirrors) and the mirror updated with it, so the app's own writes
+    aren't read back as outside edits. A change someone else makes in the
+    same moment is folded into that revision; the tail check still finds
+    rows it added or moved, and the next full comparison finds edits in place.
+    """
+    if not sheet_names:
+        return
+    revision = get_revision_tracker().get(spreadsheet, 0)
+    if revision:
+        db.set_sheet_revision(sheet_names, revision)
+
+def mirror_is_current(state, revision):
+    """Whether a sheet's mirror has every change up to revision"""
+    if not state:
+        return False
+    if revision:
+        return state['revision'] == revision
+    return bool(state['last_synced'] and datetime.now() - state['last_synced'] < MIRROR_SYNC_INTERVAL)
+
+def mirror_sheet_values(sheet_name, state, values):
+    """Bring a sheet's mirror in line with all of its values
+    
+    If the rows already mirrored are unchanged, only rows added below them
+    are stored. Any other difference in row count or content, such as rows
+    edited or deleted in the Sheets UI, mirrors the sheet again in full.
+    """
+    if not state:
+        return not values or db.append_sheet_rows(sheet_name, values[0], values[1:], 2)
+    headers, rows = (values[0], values[1:]) if values else (state['headers'], [])
+    mirrored = max(state['row_count'], 1) - 1
+    if (headers == state['headers'] and len(rows) >= mirrored
+            and db.mirror_matches(sheet_name, headers, rows[:mirrored])):
+        # Also marks the sheet synced when nothing was added
+        return db.append_sheet_rows(sheet_name, headers, rows[mirrored:], mirrored + 2)
+    return db.replace_sheet_rows(sheet_name, headers, rows)
+
+def get_sheet_tail_range(sheet_name, state):
+    """A1 range from the last mirrored row of a worksheet to its end"""
+    if not state:
+        # First sync downloads the whole sheet, header included
+        return gspread.utils.absolute_range_name(sheet_name)
+    start_row = max(state['row_count'], 1)
+    last_column = gspread.utils.rowcol_to_a1(1, len(state['headers']))[:-1]
+    return gspread.utils.absolute_range_name(sheet_name, f"A{start_row}:{last_column}")
+
+def store_sheet_values(sheet_name, state, values):
+    """Mirror the values read from get_sheet_tail_range
+    
+    The range starts on the last row already mirrored. If that row is no
+    longer there, as when the sheet shrank or rows moved, nothing is stored
+    and False is returned; the next sync finds the difference and mirrors
+    the sheet again in full.
+    """
+    if not state:
+        if not values:
+            return False
+        return db.append_sheet_rows(sheet_name, values[0], values[1:], 2)
+    if not tail_matches_mirror(sheet_name, state, values):
+        return False
+    start_row = max(state['row_count'], 1)
+    return db.append_sheet_rows(sheet_name, state['headers'], values[1:], start_row + 1)
+
+def tail_matches_mirror(sheet_name, state, values):
+    """Whether the first row of a tail read is still the last row mirrored"""
+    if not values:
+        return False
+    if state['row_count'] <= 1:
+        return values[0][:len(state['headers'])] == state['headers']
+    return db.mirror_matches(sheet_name, state['headers'], values[:1], state['row_count'])
+
+@instrumentation.traced
+def get_sheet_ids(spreadsheet, refresh=False):
+    """Map worksheet titles to sheet ids, fetching spreadsheet metadata only once
+    
+    The map is shared by all sessions, so treat it as read-only.
+    """
+    cache = get_shared_cache()
+    if refresh:
+        invalidate_worksheets()
+    
+    def load():
+        metadata = spreadsheet.fetch_sheet_metadata()
+        return {
+            sheet['properties']['title']: sheet['properties']['sheetId']
+            for sheet in metadata['sheets']
+        }
+    return cache.get('sheet_ids', load)
+
+@instrumentation.traced
+def get_worksheet(spreadsheet, title):
+    """Worksheet handle by title, looked up once for all sessions"""
+    return get_shared_cache().get(('worksheet', title), lambda: spreadsheet.worksheet(title))
+
+def invalidate_worksheets():
+    """Forget sheet ids and worksheet handles after worksheets are added, removed or renamed"""
+    cache = get_shared_cache()
+    cache.invalidate('sheet_ids')
+    cache.invalidate('worksheet')
+
+def to_cell(value):
+    """Convert a Python value to a Sheets API CellData"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {'userEnteredValue': {'numberValue': value}}
+    return {'userEnteredValue': {'stringValue': str(value)}}
+
+@instrumentation.traced
+def batch_append_rows(spreadsheet, sheet_rows, headers):
+    """Append rows to several worksheets in a single batch_update request
+    
+    sheet_rows maps worksheet titles to lists of rows and headers maps them to
+    the header row those rows follow. Worksheets that don't exist yet are
+    created in the same request, and existing ones missing trailing header
+    cells (such as Bid ID) get them filled in. The tail of every touched
+    worksheet is returned with the response and copied to the local mirror,
+    so no extra read is needed.
+    """
+    sheet_ids = dict(get_sheet_ids(spreadsheet))
+    current = set(current_mirrors(spreadsheet, [title for title in sheet_rows if title in sheet_ids]))
+    
+    requests = []
+    response_ranges = []
+    states = {}
+    for title, rows in sheet_rows.items():
+        if title in sheet_ids:
+            sheet_id = sheet_ids[title]
+            state = db.get_sheet_sync_state(title)
+            if not state:
+                # Mirror the existing rows first so their header row is known
+                sync_sheet_mirror(spreadsheet, title)
+                state = db.get_sheet_sync_state(title)
+            
+            known = state['headers'] if state else []
+            if state and len(headers[title]) > len(known) and headers[title][:len(known)] == known:
+                requests.append({'updateCells': {
+                    'start': {'sheetId': sheet_id, 'rowIndex': 0, 'columnIndex': len(known)},
+                    'rows': [{'values': [to_cell(h) for h in headers[title][len(known):]]}],
+                    'fields': 'userEnteredValue'
+                }})
+                state = dict(state, headers=headers[title])
+            states[title] = state
+        else:
+            sheet_id = max(sheet_ids.values(), default=0) + 1
+            sheet_ids[title] = sheet_id
+            requests.append({'addSheet': {'properties': {
+                'sheetId': sheet_id,
+                'title': title,
+                'gridProperties': {'rowCount': 1000, 'columnCount': 20}
+            }}})
+            rows = [headers[title]] + rows
+            db.reset_sheet_mirror(title)
+            states[title] = None
+            # Mirrored in full from the response, like any other sheet this write is current for
+            current.add(title)
+        
+        requests.append({'appendCells': {
+            'sheetId': sheet_id,
+            'rows': [{'values': [to_cell(value) for value in row]} for row in rows],
+            'fields': 'userEnteredValue'
+        }})
+        response_ranges.append(get_sheet_tail_range(title, states[title]))
+    
+    response = spreadsheet.batch_update({
+        'requests': requests,
+        'includeSpreadsheetInResponse': True,
+        'responseRanges': response_ranges,
+        'responseIncludeGridData': True
+    })
+    
+    # The updated spreadsheet carries fresh sheet ids and the requested tails
+    updated_ids = {}
+    for sheet in response['updatedSpreadsheet']['sheets']:
+        title = sheet['properties']['title']
+        updated_ids[title] = sheet['properties']['sheetId']
+        if title in sheet_rows:
+            values = [
+                [cell.get('formattedValue', '') for cell in row.get('values', [])]
+                for grid in sheet.get('data', []) for row in grid.get('rowData', [])
+            ]
+            if not store_sheet_values(title, states[title], values):
+                current.discard(title)
+    get_shared_cache().set('sheet_ids', updated_ids)
+    record_own_write(spreadsheet, [title for title in sheet_rows if title in current])
+    
+    return response
+
+def new_bid_id():
+    """Unique ID written with every bid so its rows can be found without scanning"""
+    return uuid.uuid4().hex
+
+@st.cache_resource
+def get_outbox_flusher():
+    """Background sender of saved bids to Google Sheets, one per process"""
+    return OutboxFlusher(db, lambda entries: deliver_outbox_bids(get_google_services()[1], entries))
+
+def queue_bid(key, sheet_rows, headers):
+    """Save bid rows to the local outbox and wake the flusher; True once they are on disk
+    
+    key is the idempotency key: the bid ID for a single bid, or one key per
+    bulk submission. Saving the same key twice keeps the first, and rows are
+    matched by their Bid ID on delivery, so retries never add a row twice.
+    """
+    if not db.add_outbox_bid(key, sheet_rows, headers):
+        return False
+    get_outbox_flusher().wake()
+    return True
+
+@instrumentation.traced
+def deliver_outbox_bids(spreadsheet, entries):
+    """Append outbox bids to their sheets in one batch_update, skipping rows already there
+    
+    The write isn't retried by sheets_client unless Sheets rate limited it,
+    so each attempt reaches Sheets at most once and the outbox owns retries.
+    """
+    if not spreadsheet:
+        raise RuntimeError("Not connected to Google Sheets")
+    
+    titles = {title for entry in entries for title in entry['sheet_rows']}
+    if any(entry['attempts'] for entry in entries):
+        # An earlier attempt may have reached Sheets before failing, so read
+        # the sheets' new rows into the mirror where their bid IDs can be found
+        sheet_ids = get_sheet_ids(spreadsheet)
+        if not sync_sheet_mirrors(spreadsheet, [t for t in titles if t in sheet_ids], force=True):
+            raise RuntimeError("Could not check Google Sheets for bids already sent")
+    
+    def bid_id(title, row, entry):
+        bid_column = entry['headers'][title].index("Bid ID")
+        return row[bid_column] if bid_column < len(row) else None
+    
+    delivered = db.get_mirrored_bids({
+        bid_id(title, row, entry)
+        for entry in entries for title, rows in entry['sheet_rows'].items() for row in rows
+    })
+    sheet_rows, headers = {}, {}
+    for entry in entries:
+        for title, rows in entry['sheet_rows'].items():
+            rows = [row for row in rows if (title, bid_id(title, row, entry)) not in delivered]
+            if rows:
+                sheet_rows.setdefault(title, []).extend(rows)
+                headers[title] = entry['headers'][title]
+    if sheet_rows:
+        batch_append_rows(spreadsheet, sheet_rows, headers)
+
+@instrumentation.traced
+def sheet_rows_match(spreadsheet, rows):
+    """Whether (sheet name, row number) pairs still hold in Sheets what the mirror has for them
+    
+    Reads the rows in one values_batch_get. Rows deleted or inserted in the
+    Sheets UI shift the rows below them, so mirrored row numbers are checked
+    before anything is deleted or overwritten by position.
+    """
+    states = {sheet_name: db.get_sheet_sync_state(sheet_name) for sheet_name, _ in rows}
+    if not all(states.values()):
+        return False
+    ranges = []
+    for sheet_name, row_number in rows:
+        last_column = gspread.utils.rowcol_to_a1(1, len(states[sheet_name]['headers']))[:-1]
+        ranges.append(gspread.utils.absolute_range_name(sheet_name, f"A{row_number}:{last_column}{row_number}"))
+    response = spreadsheet.values_batch_get(ranges)
+    return all(
+        value_range.get('values') and db.mirror_matches(
+            sheet_name, states[sheet_name]['headers'], value_range['values'][:1], row_number
+        )
+        for (sheet_name, row_number), value_range in zip(rows, response.get('valueRanges', []))
+    )
+
+def locate_bid_rows(spreadsheet, bid_id):
+    """The (sheet name, row number) of every row of a bid, checked against Sheets
+    
+    If the rows moved since they were mirrored, their sheets are mirrored
+    again first, so the bid is deleted or updated where it is now.
+    """
+    rows = db.get_bid_rows(bid_id)
+    if rows and not sheet_rows_match(spreadsheet, rows):
+        fetch_sheet_mirrors(spreadsheet, sorted({sheet_name for sheet_name, _ in rows}), None, verify=True)
+        rows = db.get_bid_rows(bid_id)
+    return rows
+
+@instrumentation.traced
+def delete_sheet_rows(spreadsheet, rows):
+    """Delete (sheet name, row number) pairs from Sheets and the mirror in one batch_update
+    
+    Check the rows with sheet_rows_match first; they are deleted by position.
+    """
+    sheet_ids = get_sheet_ids(spreadsheet)
+    current = current_mirrors(spreadsheet, sorted({sheet_name for sheet_name, _ in rows}))
+    
+    # Bottom-up so each delete leaves the rows still to be deleted in place
+    rows = sorted(rows, key=lambda r: r[1], reverse=True)
+    spreadsheet.batch_update({'requests': [
+        {'deleteDimension': {'range': {
+            'sheetId': sheet_ids[sheet_name],
+            'dimension': 'ROWS',
+            'startIndex': row_number - 1,
+            'endIndex': row_number
+        }}}
+        for sheet_name, row_number in rows
+    ]})
+    
+    for sheet_name, row_number in rows:
+        db.delete_sheet_row(sheet_name, row_number)
+    record_own_write(spreadsheet, current)
+
+def delete_bid(spreadsheet, bid_id):
+    """Delete a bid from the master and project sheets"""
+    try:
+        rows = locate_bid_rows(spreadsheet, bid_id)
+        if not rows:
+            st.error(f"Bid {bid_id} not found")
+            return False
+        delete_sheet_rows(spreadsheet, rows)
+        return True
+    except Exception as e:
+        st.error(f"Error deleting bid: {str(e)}")
+        return False
+
+@instrumentation.traced
+def update_bid(spreadsheet, bid_id, changes):
+    """Apply {header: value} changes to every row of a bid in one batch_update"""
+    try:
+        sheet_ids = get_sheet_ids(spreadsheet)
+        rows = locate_bid_rows(spreadsheet, bid_id)
+        if not rows:
+            st.error(f"Bid {bid_id} not found")
+            return False
+        
+        current = current_mirrors(spreadsheet, sorted({sheet_name for sheet_name, _ in rows}))
+        requests = []
+        for sheet_name, row_number in rows:
+            headers = db.get_sheet_sync_state(sheet_name)['headers']
+            for header, value in changes.items():
+                if header in headers:
+                    requests.append({'updateCells': {
+                        'start': {
+                            'sheetId': sheet_ids[sheet_name],
+                            'rowIndex': row_number - 1,
+                            'columnIndex': headers.index(header)
+                        },
+                        'rows': [{'values': [to_cell(value)]}],
+                        'fields': 'userEnteredValue'
+                    }})
+        spreadsheet.batch_update({'requests': requests})
+        
+        for sheet_name, row_number in rows:
+            db.update_sheet_row(sheet_name, row_number, changes)
+        record_own_write(spreadsheet, current)
+        return True
+    except Exception as e:
+        st.error(f"Error updating bid: {str(e)}")
+        return False
+
+# Serializes token refreshes on the shared credentials
+credentials_lock = threading.Lock()
+
+@st.cache_resource
+def get_google_credentials():
+    """Service account credentials, created once per process"""
+    return service_account.Credentials.from_service_account_info(
+        st.secrets["gcp_service_account"],
+        scopes=SCOPES
+    )
+
+@st.cache_resource
+def get_sheets_client():
+    """gspread client and HTTP session shared by all sessions"""
+    # Every Sheets call made through this client is rate limited and retried
+    return rate_limited(gspread.authorize(get_google_credentials()))
+
+def google_client_healthy(sheets_client):
+    """Refresh the shared token if it expired, reporting whether the client still works"""
+    credentials = sheets_client.http_client.auth
+    with credentials_lock:
+        if credentials.valid:
+            return True
+        try:
+            credentials.refresh(GoogleAuthRequest())
+            return credentials.valid
+        except Exception as e:
+            print(f"Google token refresh failed: {str(e)}")
+            return False
+
 def get_google_services():
     try:
         if 'gcp_service_account' not in st.secrets:
             st.error("No GCP service account secrets found")
-            return None, None, None
-            
-        credentials_dict = st.secrets["gcp_service_account"]
-        
-        credentials = service_account.Credentials.from_service_account_info(
-            credentials_dict,
-            scopes=SCOPES
-        )
+            return None, None
         
-        drive_service = build('drive', 'v3', credentials=credentials)
-        sheets_client = gspread.authorize(credentials)
+        sheets_client = get_sheets_client()
+        if not google_client_healthy(sheets_client):
+            # Rebuild the pooled credentials and client from scratch
+            get_google_credentials.clear()
+            get_sheets_client.clear()
+            sheets_client = get_sheets_client()
         
         # Get spreadsheet using permanent ID
         spreadsheet = get_spreadsheet(sheets_client)
         
-        return drive_service, sheets_client, spreadsheet
+        return sheets_client, spreadsheet
     except Exception as e:
         st.error(f"Credentials Error: {str(e)}")
-        return None, None, None
+        return None, None
 
 def create_and_share_spreadsheet(drive_service, sheets_client):
     try:
@@ -235,10 +751,7 @@ def create_and_share_spreadsheet(drive_service, sheets_client):
         worksheet.update_title("Master Sheet")
         
         # Set up headers for master sheet
-        headers = ["Date", "Contractor", "Project Name", "Project Owner", 
-                  "Location", "Unit Number", "Material", "Unit", 
-                  "Quantity", "Price", "Total"]
-        worksheet.append_row(headers)
+        worksheet.append_row(MASTER_HEADERS)
         
         # Share with your email
         spreadsheet.share(
@@ -254,40 +767,44 @@ def create_and_share_spreadsheet(drive_service, sheets_client):
         st.error(f"Error with spreadsheet: {str(e)}")
         return None
 
+@instrumentation.traced
 def delete_row(spreadsheet, sheet_name, row_index):
     try:
-        # Delete from project sheet
-        project_sheet = spreadsheet.worksheet(sheet_name)
-        project_sheet.delete_rows(row_index + 2)  # +2 for header and 1-based index
-        
-        # Find and delete corresponding row in master sheet
-        master_sheet = spreadsheet.worksheet("Master Sheet")
-        master_data = master_sheet.get_all_records()
-        
-        # Get the data from the deleted project row
-        project_data = project_sheet.get_all_records()
-        deleted_row = project_data[row_index - 1]  # -1 because row_index is 1-based
-        
-        # Find matching row in master sheet
-        for i, row in enumerate(master_data):
-            if (row['Date'] == deleted_row['Date'] and 
-                row['Contractor'] == deleted_row['Contractor'] and
-                row['Total'] == deleted_row['Total']):
-                master_sheet.delete_rows(i + 2)  # +2 for header and 1-based index
-                break
+        sync_sheet_mirrors(spreadsheet, [sheet_name, "Master Sheet"])
+        
+        project_row = row_index + 2  # +2 for header and 1-based index
+        deleted_row = db.get_sheet_row(sheet_name, project_row)
+        if not deleted_row:
+            st.error("Row not found")
+            return False
+        
+        if deleted_row.get('Bid ID'):
+            return delete_bid(spreadsheet, deleted_row['Bid ID'])
+        
+        # Rows written before bid IDs existed are matched to the master sheet by content
+        rows = [(sheet_name, project_row)]
+        master_row = db.find_sheet_row("Master Sheet", deleted_row['Date'],
+                                       deleted_row['Contractor'], deleted_row['Total'])
+        if master_row:
+            rows.append(("Master Sheet", master_row))
+        if not sheet_rows_match(spreadsheet, rows):
+            fetch_sheet_mirrors(spreadsheet, sorted({name for name, _ in rows}), None, verify=True)
+            st.error("This sheet was changed in Google Sheets. The bids have been reloaded; please try again.")
+            return False
+        delete_sheet_rows(spreadsheet, rows)
         
         return True
     except Exception as e:
         st.error(f"Error deleting row: {str(e)}")
         return False
 
+@instrumentation.traced
 def save_to_sheets(spreadsheet, data, project_name):
     try:
-        time.sleep(1)  # Add delay before saving
+        bid_id = new_bid_id()
         
-        # Always save to Master Sheet
-        master_sheet = spreadsheet.worksheet("Master Sheet")
-        master_sheet.append_row([
+        # Format data for master sheet
+        master_data = [
             data[0],  # Date
             data[1],  # Contractor
             data[2],  # Project Name
@@ -298,22 +815,9 @@ def save_to_sheets(spreadsheet, data, project_name):
             data[7],  # Unit
             data[8],  # Quantity
             data[9],  # Price
-            data[10]  # Total
-        ])
-        
-        time.sleep(1)  # Add delay between operations
-        
-        # Get or create project-specific sheet
-        try:
-            project_sheet = spreadsheet.worksheet(project_name)
-        except:
-            time.sleep(1)  # Add delay before creating new sheet
-            project_sheet = spreadsheet.add_worksheet(project_name, 1000, 20)
-            headers = ["Date", "Contractor", "Location", "Unit Number",
-                      "Material", "Unit", "Quantity", "Price", "Total"]
-            project_sheet.append_row(headers)
-        
-        time.sleep(1)  # Add delay before final save
+            data[10], # Total
+            bid_id
+        ]
         
         # Format data for project sheet
         project_data = [
@@ -325,32 +829,23 @@ def save_to_sheets(spreadsheet, data, project_name):
             data[7],  # Unit
             data[8],  # Quantity
             data[9],  # Price
-            data[10]  # Total
+            data[10], # Total
+            bid_id
         ]
-        project_sheet.append_row(project_data)
         
-        # Clear cache to force refresh
-        st.session_state.cache['spreadsheet'] = None
-        st.session_state.cache['materials'] = None
+        # Both rows go out in one request, creating the project sheet if needed
+        if not queue_bid(
+            bid_id,
+            {"Master Sheet": [master_data], project_name: [project_data]},
+            headers={"Master Sheet": MASTER_HEADERS, project_name: PROJECT_HEADERS}
+        ):
+            st.error("Error saving bid")
+            return
         
-        st.success("Bid saved successfully!")
+        st.success("Bid saved successfully! It will appear in Google Sheets shortly.")
         
     except Exception as e:
-        if "429" in str(e):
-            st.error("Rate limit reached. Please wait a moment and try again.")
-        else:
-            st.error(f"Error saving bid: {str(e)}")
-
-def calculate_contractor_totals(data):
-    contractor_totals = {}
-    for row in data:
-        contractor = row['Contractor']
-        try:
-            total = float(str(row['Total']).replace('$', '').replace(',', ''))
-            contractor_totals[contractor] = contractor_totals.get(contractor, 0) + total
-        except (ValueError, KeyError):
-            continue
-    return contractor_totals
+        st.error(f"Error saving bid: {str(e)}")
 
 def format_currency(amount):
     return f"${amount:,.2f}"
@@ -370,14 +865,16 @@ def share_spreadsheet(drive_service, spreadsheet):
     except Exception as e:
         st.error(f"Error sharing spreadsheet: {str(e)}")
 
+@instrumentation.traced
 def get_or_create_materials_sheet(spreadsheet):
     try:
         # Try to get Materials sheet
         try:
-            materials_sheet = spreadsheet.worksheet("Materials")
+            materials_sheet = get_worksheet(spreadsheet, "Materials")
         except:
             # Create Materials sheet if it doesn't exist
             materials_sheet = spreadsheet.add_worksheet("Materials", 1000, 2)
+            invalidate_worksheets()
             materials_sheet.append_row(["Material", "Unit"])
             # Add some default materials
             default_materials = [
@@ -392,89 +889,61 @@ def get_or_create_materials_sheet(spreadsheet):
         st.error(f"Error with materials sheet: {str(e)}")
         return None
 
+@instrumentation.traced
 def get_materials_from_sheet(spreadsheet):
     try:
-        # Use cached materials if available and less than 5 minutes old
-        if (st.session_state.cache['materials'] and 
-            st.session_state.cache['materials_last_refresh'] and 
-            datetime.now() - st.session_state.cache['materials_last_refresh'] < timedelta(minutes=5)):
-            return st.session_state.cache['materials']
-            
-        time.sleep(1)  # Add delay to prevent quota issues
-        materials_sheet = get_or_create_materials_sheet(spreadsheet)
-        if not materials_sheet:
-            return {}
-            
-        # Get all data from the Materials sheet
-        all_data = materials_sheet.get_all_values()
-        
-        # Skip header row and create list of materials
-        materials_data = []
-        for row in all_data[1:]:  # Skip header row
-            if row and len(row) >= 2 and row[0].strip():  # Check for valid rows
-                materials_data.append({
-                    'Material': row[0].strip(),
-                    'Unit': row[1].strip() if len(row) > 1 and row[1].strip() else 'SF'
-                })
-        
-        # Update cache
-        st.session_state.cache['materials'] = materials_data
-        st.session_state.cache['materials_last_refresh'] = datetime.now()
-        
-        return materials_data
+        # Use cached materials until the spreadsheet changes, or for
+        # MATERIALS_CACHE_TTL if its revision can't be checked
+        revision = get_spreadsheet_revision(spreadsheet)
+        materials_data = get_shared_cache().get(
+            'materials',
+            lambda: read_materials(spreadsheet),
+            ttl=None if revision else MATERIALS_CACHE_TTL.total_seconds(),
+            revision=revision
+        )
+        return materials_data if materials_data is not None else {}
     except Exception as e:
         st.error(f"Error getting materials: {str(e)}")
         return {}
 
+def read_materials(spreadsheet):
+    """Materials and their units from the Materials sheet, or None if it can't be opened"""
+    materials_sheet = get_or_create_materials_sheet(spreadsheet)
+    if not materials_sheet:
+        return None
+        
+    # Get all data from the Materials sheet
+    all_data = materials_sheet.get_all_values()
+    
+    # Skip header row and create list of materials
+    materials_data = []
+    for row in all_data[1:]:  # Skip header row
+        if row and len(row) >= 2 and row[0].strip():  # Check for valid rows
+            materials_data.append({
+                'Material': row[0].strip(),
+                'Unit': row[1].strip() if len(row) > 1 and row[1].strip() else 'SF'
+            })
+    return materials_data
+
+@st.cache_resource
+def get_material_stats_engine():
+    """Material statistics shared by all sessions"""
+    return MaterialStats()
+
+@instrumentation.traced
 def get_material_stats(spreadsheet):
     try:
-        master_sheet = spreadsheet.worksheet("Master Sheet")
-        data = master_sheet.get_all_records()
-        
-        # Calculate averages by material
-        material_stats = {}
-        for row in data:
-            material = str(row['Material']).strip()
-            if not material:
-                continue
-                
-            unit = row['Unit']
-            try:
-                price = float(str(row['Price']).replace('$', '').replace(',', ''))
-            except (ValueError, TypeError):
-                continue
-            
-            if material not in material_stats:
-                material_stats[material] = {
-                    'units': set([unit]),
-                    'prices': [price],
-                    'total_price': price,
-                    'count': 1,
-                    'default_unit': unit
-                }
-            else:
-                stats = material_stats[material]
-                stats['units'].add(unit)
-                stats['prices'].append(price)
-                stats['total_price'] += price
-                stats['count'] += 1
-        
-        # Calculate averages
-        for material in material_stats:
-            stats = material_stats[material]
-            stats['avg_price'] = stats['total_price'] / stats['count']
-            stats['most_common_unit'] = max(stats['units'], 
-                                          key=lambda x: sum(1 for row in data 
-                                          if row['Material'] == material and row['Unit'] == x))
-            
-        return material_stats
+        sync_sheet_mirror(spreadsheet, "Master Sheet")
+        
+        # Only rows appended since the last call are folded in
+        return get_material_stats_engine().refresh(db, "Master Sheet")
     except Exception as e:
         st.error(f"Error calculating material stats: {str(e)}")
         return {}
 
+@instrumentation.traced
 def add_new_material(spreadsheet, material_name, unit='SF'):
     try:
-        time.sleep(1)  # Add delay before operation
         materials_sheet = get_or_create_materials_sheet(spreadsheet)
         if not materials_sheet:
             return False
@@ -488,8 +957,9 @@ def add_new_material(spreadsheet, material_name, unit='SF'):
         # Add new material
         materials_sheet.append_row([material_name, unit])
         
-        # Clear materials cache to force refresh
-        st.session_state.cache['materials'] = None
+        # Re-read the materials for every session now rather than at the next refresh
+        get_shared_cache().invalidate('materials')
+        get_prefetcher().wake()
         
         st.success(f"Added new material: {material_name}")
         return True
@@ -497,7 +967,7 @@ def add_new_material(spreadsheet, material_name, unit='SF'):
         st.error(f"Error adding material: {str(e)}")
         return False
 
-def display_bid_history(worksheet):
+def display_bid_history(worksheet, project_name=None, project_owner=''):
     """Display bid history"""
     try:
         # Get contractor profiles
@@ -581,6 +1051,7 @@ def display_bid_history(worksheet):
                 else:
                     try:
                         # Prepare row data
+                        bid_id = new_bid_id()
                         row_data = [
                             date.strftime("%Y-%m-%d"),
                             final_contractor,
@@ -590,56 +1061,211 @@ def display_bid_history(worksheet):
                             unit,
                             quantity,
                             price,
-                            total
+                            total,
+                            bid_id
                         ]
                         
-                        # Save to Google Sheet
-                        worksheet.append_row(row_data)
-                        st.success("Bid successfully added!")
-                        time.sleep(0.5)
-                        st.rerun()
+                        # Saved locally first; the outbox flusher sends it to Google Sheets
+                        if queue_bid(
+                            bid_id,
+                            {worksheet.title: [row_data]},
+                            headers={worksheet.title: PROJECT_HEADERS}
+                        ):
+                            st.success("Bid successfully added!")
+                            time.sleep(0.5)
+                            st.rerun()
+                        else:
+                            st.error("Error adding bid")
                     except Exception as e:
                         st.error(f"Error adding bid: {str(e)}")
         
+        with st.expander("📝 Bulk Entry: many line items at once"):
+            display_bulk_bid_entry(worksheet, contractor_profiles, project_name, project_owner)
+        
         # Display bid history
         st.subheader("Bid History")
-        bids = get_recent_bids(worksheet)
-        
-        if bids:
-            # Calculate total value
-            total_value = sum(bid['Total'] for bid in bids)
-            
-            # Display summary metrics
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric("Total Bids", len(bids))
-            with col2:
-                st.metric("Total Value", f"${total_value:,.2f}")
-            
-            # Convert bids to DataFrame for table display
-            df = pd.DataFrame(bids)
-            df['Date'] = pd.to_datetime(df['Date']).dt.strftime('%Y-%m-%d')
-            df['Price'] = df['Price'].map('${:,.2f}'.format)
-            df['Total'] = df['Total'].map('${:,.2f}'.format)
-            df['Quantity'] = df['Quantity'].map('{:,.1f}'.format)
+        display_bid_history_page(worksheet)
             
-            # Reorder columns for display
-            columns = ['Date', 'Contractor', 'Location', 'Unit Number', 
-                      'Material', 'Quantity', 'Unit', 'Price', 'Total']
-            df = df[columns]
-            
-            # Display as table
-            st.dataframe(
-                df,
-                use_container_width=True,
-                hide_index=True
-            )
+    except Exception as e:
+        st.error(f"Error displaying bid history: {str(e)}")
+
+def empty_bulk_lines(count=BULK_ENTRY_ROWS):
+    """Blank line items for the bulk entry grid"""
+    return pd.DataFrame({
+        'Unit Number': pd.Series([''] * count, dtype=object),
+        'Material': pd.Series([''] * count, dtype=object),
+        'Unit': pd.Series([None] * count, dtype=object),
+        'Quantity': pd.Series([None] * count, dtype='float64'),
+        'Price': pd.Series([None] * count, dtype='float64')
+    })
+
+def prepare_bulk_lines(lines):
+    """Drop blank line items, compute totals and find incomplete ones, a column at a time
+    
+    Returns the filled-in lines with a Total column and the grid row numbers,
+    from 1, of lines missing a material or unit or without a positive
+    quantity and price.
+    """
+    text = lines[['Unit Number', 'Material', 'Unit']].fillna('').astype(str).apply(lambda c: c.str.strip())
+    numbers = lines[['Quantity', 'Price']].apply(pd.to_numeric, errors='coerce')
+    blank = text.eq('').all(axis=1) & numbers.isna().all(axis=1)
+    complete = (text['Material'].ne('') & text['Unit'].ne('')
+                & numbers['Quantity'].gt(0) & numbers['Price'].gt(0))
+    incomplete = [int(i) + 1 for i in (~complete & ~blank).to_numpy().nonzero()[0]]
+    
+    filled = pd.concat([text, numbers], axis=1)[~blank].reset_index(drop=True)
+    filled['Total'] = (filled['Quantity'] * filled['Price']).round(2)
+    return filled, incomplete
+
+def queue_bulk_bids(key, sheet_name, project_name, project_owner, date, contractor, location, lines):
+    """Queue the line items of a bulk entry as one outbox entry, each with its own bid ID
+    
+    All rows go to the project sheet, and to the master sheet when
+    project_name is given, in one request when the outbox is flushed.
+    """
+    date = date.strftime("%Y-%m-%d")
+    columns = [lines[column].tolist() for column in ('Unit Number', 'Material', 'Unit', 'Quantity', 'Price', 'Total')]
+    project_rows, master_rows = [], []
+    for unit_number, material, unit, quantity, price, total in zip(*columns):
+        bid_id = new_bid_id()
+        project_rows.append([date, contractor, location, unit_number, material, unit,
+                             quantity, price, total, bid_id])
+        master_rows.append([date, contractor, project_name, project_owner, location, unit_number,
+                            material, unit, quantity, price, total, bid_id])
+    
+    sheet_rows = {sheet_name: project_rows}
+    headers = {sheet_name: PROJECT_HEADERS}
+    if project_name:
+        sheet_rows["Master Sheet"] = master_rows
+        headers["Master Sheet"] = MASTER_HEADERS
+    return queue_bid(key, sheet_rows, headers)
+
+@st.fragment
+@instrumentation.rendered("Bid Entry")
+def display_bulk_bid_entry(worksheet, contractor_profiles, project_name=None, project_owner=''):
+    """Grid for a contractor's whole bid tabulation, saved with a single write
+    
+    Editing the grid reruns only this fragment, so totals stay live without
+    rerunning the page.
+    """
+    # One idempotency key per grid, so submitting it twice queues it once
+    if 'bulk_entry' not in st.session_state:
+        st.session_state.bulk_entry = {'key': new_bid_id(), 'grid': 0}
+    bulk_entry = st.session_state.bulk_entry
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        date = st.date_input("Date", datetime.today(), key="bulk_date")
+    with col2:
+        contractors = sorted(contractor_profiles)
+        contractor = st.selectbox("Contractor", [""] + contractors + ["New Contractor"], key="bulk_contractor")
+        if contractor == "New Contractor":
+            contractor = st.text_input("Enter New Contractor Name", key="bulk_new_contractor").strip()
+    with col3:
+        location = st.text_input("Location", key="bulk_location").strip()
+    
+    lines = st.data_editor(
+        empty_bulk_lines(),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Material': st.column_config.TextColumn(required=False),
+            'Unit': st.column_config.SelectboxColumn(options=DEFAULT_UNITS),
+            'Quantity': st.column_config.NumberColumn(min_value=0.0, step=0.1),
+            'Price': st.column_config.NumberColumn(min_value=0.0, step=0.01, format="dollar")
+        },
+        key=f"bulk_lines_{bulk_entry['grid']}"
+    )
+    filled, incomplete = prepare_bulk_lines(lines)
+    st.write(f"{len(filled)} line item(s), total: ${filled['Total'].sum():,.2f}")
+    
+    if st.button("Submit All Line Items", key="bulk_submit"):
+        if not (contractor and location):
+            st.error("Please enter the contractor and location")
+        elif incomplete:
+            st.error(f"Please complete or clear row(s) {', '.join(map(str, incomplete))}: "
+                     "each needs a material, unit, quantity and price")
+        elif filled.empty:
+            st.error("Please enter at least one line item")
+        elif queue_bulk_bids(bulk_entry['key'], worksheet.title, project_name, project_owner,
+                             date, contractor, location, filled):
+            # A fresh grid and key for the next bid
+            st.session_state.bulk_entry = {'key': new_bid_id(), 'grid': bulk_entry['grid'] + 1}
+            st.success(f"Saved {len(filled)} line items!")
+            time.sleep(0.5)
+            st.rerun()
         else:
+            st.error("Error saving line items")
+
+@st.fragment
+@instrumentation.rendered("Bid Entry")
+def display_bid_history_page(worksheet):
+    """Display summary metrics and one page of bid history
+
+    Changing the page or sort order reruns only this fragment, and only the
+    visible rows are read from the local mirror.
+    """
+    try:
+        sync_sheet_mirror(worksheet.spreadsheet, worksheet.title)
+        bid_count, total_value = db.get_sheet_totals(worksheet.title)
+        if not bid_count:
             st.warning("No bids found in the sheet")
-            
+            return
+        
+        # Display summary metrics
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Total Bids", bid_count)
+        with col2:
+            st.metric("Total Value", f"${total_value:,.2f}")
+        
+        # Paging and sort controls
+        page_count = (bid_count - 1) // BID_HISTORY_PAGE_SIZE + 1
+        if st.session_state.get("bid_history_page", 1) > page_count:
+            st.session_state.bid_history_page = page_count
+        col1, col2 = st.columns(2)
+        with col1:
+            sort_choice = st.selectbox("Sort by", list(BID_HISTORY_SORTS), key="bid_history_sort")
+        with col2:
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1,
+                                   step=1, key="bid_history_page")
+        
+        sort_by, descending = BID_HISTORY_SORTS[sort_choice]
+        offset = (page - 1) * BID_HISTORY_PAGE_SIZE
+        page_size = min(BID_HISTORY_PAGE_SIZE, bid_count - offset)
+        if offset > bid_count // 2:
+            # Later pages are read from the other end of the sort to keep the OFFSET short
+            bids = get_recent_bids(worksheet, sort_by=sort_by, descending=not descending,
+                                   limit=page_size, offset=bid_count - offset - page_size)
+            bids.reverse()
+        else:
+            bids = get_recent_bids(worksheet, sort_by=sort_by, descending=descending,
+                                   limit=page_size, offset=offset)
+        
+        columns = ['Date', 'Contractor', 'Location', 'Unit Number',
+                   'Material', 'Quantity', 'Unit', 'Price', 'Total']
+        df = pd.DataFrame(bids, columns=columns)
+        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+        
+        # Formatting is applied by the browser, so the numbers stay numeric
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'Date': st.column_config.DateColumn(format="YYYY-MM-DD"),
+                'Quantity': st.column_config.NumberColumn(format="%.1f"),
+                'Price': st.column_config.NumberColumn(format="dollar"),
+                'Total': st.column_config.NumberColumn(format="dollar")
+            }
+        )
+        st.caption(f"Showing {offset + 1}-{offset + len(bids)} of {bid_count} bids")
+        
     except Exception as e:
         st.error(f"Error displaying bid history: {str(e)}")
 
+@instrumentation.traced
 def create_new_project(spreadsheet, project_name, owner_name):
     try:
         # Format sheet name to include owner
@@ -652,14 +1278,13 @@ def create_new_project(spreadsheet, project_name, owner_name):
             return False
         except:
             # Create new project sheet
-            time.sleep(1)  # Add delay before creating sheet
             project_sheet = spreadsheet.add_worksheet(sheet_name, 1000, 20)
-            headers = ["Date", "Contractor", "Location", "Unit Number",
-                      "Material", "Unit", "Quantity", "Price", "Total"]
-            project_sheet.append_row(headers)
+            project_sheet.append_row(PROJECT_HEADERS)
+            invalidate_worksheets()
             
             # Add to database
             db.add_project(project_name, owner_name)
+            get_shared_cache().invalidate('projects')
             
             st.success(f"Created new project: {project_name} for {owner_name}")
             return True
@@ -672,7 +1297,7 @@ def project_tracking_dashboard(spreadsheet):
     st.markdown("## 📊 Project Tracking Dashboard")
     
     # Get all projects
-    projects = db.get_projects()
+    projects = get_projects()
     if not projects:
         st.info("No projects found")
         return
@@ -695,139 +1320,328 @@ def project_tracking_dashboard(spreadsheet):
     # Project Overview
     st.markdown("### Project Overview")
     
-    # Initialize totals
-    project_data = []
+    # Shown at once from the local rollups, then updated as stale sheets sync
+    sheet_names = {project_name: format_sheet_name(project_name) for project_name, _ in projects}
+    project_data, contractor_breakdowns = get_project_overview(projects, sheet_names.values())
+    status = st.empty()
+    overview = st.empty()
+    render_project_overview(overview, project_data)
     
-    for project_name, owner in projects:
-        try:
-            sheet_name = format_sheet_name(project_name, owner)
-            project_sheet = spreadsheet.worksheet(sheet_name)
-            bids = project_sheet.get_all_records()
-            
-            if not bids:
-                continue
-                
-            # Calculate project metrics
-            total_bids = len(bids)
-            total_value = sum(float(str(bid['Total']).replace('$', '').replace(',', '')) for bid in bids)
-            
-            # Get unique contractors
-            contractors = set(bid['Contractor'] for bid in bids)
-            
-            # Get latest bid date
-            latest_bid = max(bids, key=lambda x: x['Date'])
-            latest_date = latest_bid['Date']
-            
-            # Calculate contractor breakdown
-            contractor_totals = {}
-            for bid in bids:
-                contractor = bid['Contractor']
-                amount = float(str(bid['Total']).replace('$', '').replace(',', ''))
-                contractor_totals[contractor] = contractor_totals.get(contractor, 0) + amount
-            
-            # Find lowest bidder
-            lowest_bidder = min(contractor_totals.items(), key=lambda x: x[1])[0]
-            
-            project_data.append({
-                'Project': project_name,
-                'Owner': owner,
-                'Total Bids': total_bids,
-                'Total Value': total_value,
-                'Contractors': len(contractors),
-                'Latest Activity': latest_date,
-                'Lowest Bidder': lowest_bidder,
-                'Avg Bid': total_value / total_bids if total_bids > 0 else 0
-            })
-            
-        except Exception as e:
-            st.error(f"Error processing {project_name}: {str(e)}")
+    # Project Details Expander, one per project, each filled in on its own
+    sheet_ids = get_sheet_ids(spreadsheet)
+    details = {}
+    for project_name, _ in projects:
+        if project_name in project_data or sheet_names[project_name] in sheet_ids:
+            with st.expander(f"📋 {project_name} Details"):
+                details[project_name] = st.empty()
+                if project_name in project_data:
+                    render_project_details(details[project_name], project_data[project_name],
+                                           contractor_breakdowns[project_name])
+                else:
+                    details[project_name].caption("Loading bids…")
+    
+    revision, stale = get_stale_mirrors(
+        spreadsheet, [name for name in sheet_names.values() if name in sheet_ids]
+    )
+    if not stale:
+        return
     
-    if project_data:
-        # Convert to DataFrame
-        df = pd.DataFrame(project_data)
+    status.caption(f"Checking {len(stale)} project sheet(s) for new bids…")
+    failed = []
+    for chunk, error in sync_mirrors_concurrently(spreadsheet, stale, revision):
+        if error:
+            failed.append(f"{', '.join(chunk)}: {error}")
+            continue
         
-        # Format currency columns
-        df['Total Value'] = df['Total Value'].apply(lambda x: f"${x:,.2f}")
-        df['Avg Bid'] = df['Avg Bid'].apply(lambda x: f"${x:,.2f}")
+        # Redraw the overview and the details of just the projects that synced
+        synced = [project_name for project_name, _ in projects if sheet_names[project_name] in chunk]
+        synced_data, synced_breakdowns = get_project_overview(
+            [(name, owner) for name, owner in projects if name in synced], chunk
+        )
+        project_data.update(synced_data)
+        render_project_overview(overview, project_data)
+        for project_name in synced:
+            if project_name in details and project_name in synced_data:
+                render_project_details(details[project_name], synced_data[project_name],
+                                       synced_breakdowns[project_name])
+    
+    if failed:
+        status.warning("Some projects couldn't be refreshed and show their last synced totals:\n\n"
+                       + "\n\n".join(failed))
+    else:
+        status.empty()
+
+def get_project_overview(projects, sheet_names):
+    """Overview rows and contractor breakdowns of (name, owner) projects, from the local rollups"""
+    # Totals are kept up to date as bids are mirrored, so this is one lookup per table
+    rollups = db.get_project_rollups(list(sheet_names))
+    contractor_rollups = db.get_contractor_rollups(list(rollups))
+    
+    project_data = {}
+    contractor_breakdowns = {}
+    for project_name, owner in projects:
+        sheet_name = format_sheet_name(project_name)
+        if sheet_name not in rollups:
+            continue
+        total_bids, total_value, contractor_count, latest_date, lowest_bidder = rollups[sheet_name]
         
-        # Display project table
-        st.dataframe(df, use_container_width=True)
+        contractor_breakdowns[project_name] = {
+            contractor: {'total': total, 'count': count, 'avg': total / count}
+            for contractor, count, total in contractor_rollups.get(sheet_name, [])
+        }
         
-        # Project Details Expander
-        for project in project_data:
-            with st.expander(f"📋 {project['Project']} Details"):
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.markdown(f"**Owner:** {project['Owner']}")
-                    st.markdown(f"**Total Bids:** {project['Total Bids']}")
-                    st.markdown(f"**Total Value:** {project['Total Value']}")
-                
-                with col2:
-                    st.markdown(f"**Contractors:** {project['Contractors']}")
-                    st.markdown(f"**Latest Activity:** {project['Latest Activity']}")
-                    st.markdown(f"**Lowest Bidder:** {project['Lowest Bidder']}")
-                
-                # Get contractor breakdown for this project
-                sheet_name = format_sheet_name(project['Project'], project['Owner'])
-                project_sheet = spreadsheet.worksheet(sheet_name)
-                bids = project_sheet.get_all_records()
-                
-                contractor_data = {}
-                for bid in bids:
-                    contractor = bid['Contractor']
-                    amount = float(str(bid['Total']).replace('$', '').replace(',', ''))
-                    if contractor not in contractor_data:
-                        contractor_data[contractor] = {
-                            'total': amount,
-                            'count': 1,
-                            'avg': amount
-                        }
-                    else:
-                        contractor_data[contractor]['total'] += amount
-                        contractor_data[contractor]['count'] += 1
-                        contractor_data[contractor]['avg'] = (
-                            contractor_data[contractor]['total'] / 
-                            contractor_data[contractor]['count']
-                        )
-                
-                # Display contractor breakdown
-                st.markdown("#### Contractor Breakdown")
-                contractor_df = pd.DataFrame([
-                    {
-                        'Contractor': contractor,
-                        'Total Bids': data['count'],
-                        'Total Value': f"${data['total']:,.2f}",
-                        'Average Bid': f"${data['avg']:,.2f}"
-                    }
-                    for contractor, data in contractor_data.items()
-                ])
-                st.dataframe(contractor_df, use_container_width=True)
+        project_data[project_name] = {
+            'Project': project_name,
+            'Owner': owner,
+            'Total Bids': total_bids,
+            'Total Value': total_value,
+            'Contractors': contractor_count,
+            'Latest Activity': latest_date,
+            'Lowest Bidder': lowest_bidder,
+            'Avg Bid': total_value / total_bids if total_bids > 0 else 0
+        }
+    return project_data, contractor_breakdowns
+
+def render_project_overview(placeholder, project_data):
+    """Draw the project table into placeholder, replacing what it showed"""
+    if not project_data:
+        return
+    # Convert to DataFrame
+    df = pd.DataFrame(list(project_data.values()))
+    
+    # Format currency columns
+    df['Total Value'] = df['Total Value'].apply(lambda x: f"${x:,.2f}")
+    df['Avg Bid'] = df['Avg Bid'].apply(lambda x: f"${x:,.2f}")
+    
+    # Display project table
+    placeholder.dataframe(df, use_container_width=True)
+
+def render_project_details(placeholder, project, contractor_data):
+    """Draw one project's details and contractor breakdown into placeholder"""
+    with placeholder.container():
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown(f"**Owner:** {project['Owner']}")
+            st.markdown(f"**Total Bids:** {project['Total Bids']}")
+            st.markdown(f"**Total Value:** ${project['Total Value']:,.2f}")
+        
+        with col2:
+            st.markdown(f"**Contractors:** {project['Contractors']}")
+            st.markdown(f"**Latest Activity:** {project['Latest Activity']}")
+            st.markdown(f"**Lowest Bidder:** {project['Lowest Bidder']}")
+        
+        st.markdown("#### Contractor Breakdown")
+        contractor_df = pd.DataFrame([
+            {
+                'Contractor': contractor,
+                'Total Bids': data['count'],
+                'Total Value': f"${data['total']:,.2f}",
+                'Average Bid': f"${data['avg']:,.2f}"
+            }
+            for contractor, data in contractor_data.items()
+        ])
+        st.dataframe(contractor_df, use_container_width=True)
+
+def sync_mirrors_concurrently(spreadsheet, sheet_names, revision):
+    """Sync sheets in chunks on a bounded thread pool, yielding (chunk, error) as each finishes
+    
+    Each chunk is one values_batch_get, so the Sheets rate limiter paces the
+    workers, and a chunk that fails doesn't hold up the others.
+    """
+    chunks = [
+        sheet_names[i:i + DASHBOARD_SYNC_BATCH]
+        for i in range(0, len(sheet_names), DASHBOARD_SYNC_BATCH)
+    ]
+    with ThreadPoolExecutor(max_workers=min(DASHBOARD_WORKERS, len(chunks))) as pool:
+        # Run in a copy of the caller's context so the calls are charged to its render
+        futures = {
+            pool.submit(contextvars.copy_context().run, fetch_sheet_mirrors, spreadsheet, chunk, revision): chunk
+            for chunk in chunks
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                yield futures[future], None
+            except Exception as e:
+                yield futures[future], str(e) or type(e).__name__
+
+@st.cache_resource
+def get_geocoder():
+    """Geocoder shared by all sessions; set geocoder = "offline" in secrets to skip Nominatim
+    
+    Offline, addresses resolve only to their town's center; see GazetteerBackend.
+    """
+    backends = [GazetteerBackend()]
+    if st.secrets.get("geocoder", "nominatim") != "offline":
+        backends.insert(0, NominatimBackend())
+    return Geocoder(db, backends)
 
+@instrumentation.traced
 def geocode_address(address):
     try:
-        geolocator = Nominatim(user_agent="bid_tracker")
-        location = geolocator.geocode(address)
-        if location:
-            return [location.latitude, location.longitude]
-        return None
+        # Repeat addresses are answered from the cache
+        return get_geocoder().geocode(address)
     except Exception as e:
         st.error(f"Error geocoding address: {str(e)}")
         return None
 
+def locations_version(locations):
+    """Fingerprint of what the map shows for a project's locations"""
+    return hash(tuple(
+        (location['address'], location.get('status'), tuple(location.get('coordinates') or ()),
+         location.get('date_added'))
+        for location in locations
+    ))
+
+@st.cache_data(max_entries=32)
+def render_project_map(project_name, version, _locations):
+    """HTML of a folium map of a project's locations, rendered once per version of them"""
+    # Initialize map centered on New Jersey
+    m = folium.Map(location=[40.0583, -74.4057], zoom_start=8)
+    
+    # Add locations to map
+    markers = []
+    for location in _locations:
+        try:
+            if location.get('coordinates'):
+                # Get stage info
+                current_stage = location.get('status', 'Not Started')
+                stage_info = PROJECT_STAGES[current_stage]
+                
+                # Create popup content; notes are left out so editing them doesn't rebuild the map
+                popup_html = f"""
+                <div style='width: 200px'>
+                    <h4>{location['address']}</h4>
+                    <p><b>Current Stage:</b> {stage_info['icon']} {current_stage}</p>
+                    <p><b>Added:</b> {location.get('date_added', 'N/A')}</p>
+                </div>
+                """
+                
+                # Add marker to map
+                folium.Marker(
+                    location=location['coordinates'],
+                    popup=folium.Popup(popup_html, max_width=300),
+                    icon=folium.Icon(color=stage_info['color'])
+                ).add_to(m)
+                
+                markers.append(location['coordinates'])
+        
+        except Exception as e:
+            print(f"Error adding marker for {location['address']}: {str(e)}")
+    
+    # Fit map to markers if any exist
+    if markers:
+        m.fit_bounds(markers)
+    return m.get_root().render()
+
+@st.fragment
+@instrumentation.rendered("Project Status")
+def display_project_locations(selected_project, project_key):
+    """Stage, checklist and notes editors for each location of a project
+
+    Ticking a checklist box or editing notes reruns only this fragment, so the
+    map above isn't rendered or sent to the browser again.
+    """
+    for idx, location in enumerate(st.session_state.project_locations[project_key]):
+        # Ensure location has a valid status
+        if 'status' not in location or location['status'] not in PROJECT_STAGES:
+            location['status'] = 'Not Started'
+        
+        stage_info = PROJECT_STAGES[location['status']]
+        
+        with st.expander(f"{stage_info['icon']} {location['address']} - {location['status']}"):
+            col1, col2 = st.columns([1, 1])
+            
+            with col1:
+                # Stage selection
+                new_status = st.selectbox(
+                    "Current Stage",
+                    list(PROJECT_STAGES.keys()),
+                    key=f"status_{idx}",
+                    index=list(PROJECT_STAGES.keys()).index(location.get('status', 'Not Started'))
+                )
+                
+                if new_status != location['status']:
+                    location['status'] = new_status
+                    db.update_project_location_status(
+                        project_name=selected_project,
+                        location_address=location['address'],
+                        new_status=new_status
+                    )
+                    # The map and progress outside this fragment show stages too
+                    st.rerun()
+            
+            with col2:
+                # Checklist
+                st.markdown("#### Progress Checklist")
+                checklist_updated = False
+                
+                if 'checklist' not in location:
+                    location['checklist'] = {stage: False for stage in CONCRETE_CHECKLIST}
+                
+                for stage, info in CONCRETE_CHECKLIST.items():
+                    checked = st.checkbox(
+                        f"{info['icon']} {stage}",
+                        value=location['checklist'].get(stage, False),
+                        key=f"check_{idx}_{stage}"
+                    )
+                    if checked != location['checklist'].get(stage, False):
+                        location['checklist'][stage] = checked
+                        checklist_updated = True
+                
+                if checklist_updated:
+                    db.update_project_location_checklist(
+                        project_name=selected_project,
+                        location_address=location['address'],
+                        checklist=location['checklist']
+                    )
+            
+            # Calculate checklist progress
+            completed_steps = sum(1 for step in location['checklist'].values() if step)
+            total_steps = len(CONCRETE_CHECKLIST)
+            progress = completed_steps / total_steps
+            
+            st.progress(progress)
+            st.markdown(f"**Checklist Progress:** {progress * 100:.0f}%")
+            
+            # Notes section
+            new_notes = st.text_area(
+                "Notes",
+                value=location.get('notes', ''),
+                key=f"notes_{idx}"
+            )
+            
+            if new_notes != location.get('notes', ''):
+                location['notes'] = new_notes
+                db.update_project_location_notes(
+                    project_name=selected_project,
+                    location_address=location['address'],
+                    new_notes=new_notes
+                )
+            
+            # Delete location button
+            if st.button("Delete Location", key=f"delete_{idx}"):
+                # Delete from database
+                db.delete_project_location(
+                    project_name=selected_project,
+                    location_address=location['address']
+                )
+                # Update session state
+                st.session_state.project_locations[project_key].pop(idx)
+                st.rerun()
+
 def project_status_dashboard(spreadsheet):
     st.markdown("## 📍 Project Status & Location Tracking")
     
     try:
         from folium import plugins
-        from geopy.geocoders import Nominatim
-        from geopy.exc import GeocoderTimedOut
     except ImportError:
-        st.error("Please install required packages: pip install folium streamlit-folium geopy")
+        st.error("Please install required packages: pip install folium geopy")
         return
     
     # Get all projects
-    projects = db.get_projects()
+    projects = get_projects()
     if not projects:
         st.info("No projects found")
         return
@@ -868,109 +1682,84 @@ def project_status_dashboard(spreadsheet):
         
         if add_location and new_location:
             try:
-                print(f"\nDEBUG: Starting location addition process")
-                print(f"Selected project: {selected_project}")
-                print(f"New location: {new_location}")
-
                 # Verify project exists
                 project_owner = db.get_project_owner(selected_project)
                 if not project_owner:
                     st.error(f"Project '{selected_project}' not found in database")
-                    print(f"ERROR: Project not found in database")
                     return
-                print(f"DEBUG: Project owner found: {project_owner}")
 
-                # Geocode address
-                print("DEBUG: Starting geocoding")
-                geolocator = Nominatim(user_agent="bid_tracker")
-                geo_location = geolocator.geocode(new_location)
+                # Geocode address; the call and its cache hit or miss show in the diagnostics panel
+                coordinates = geocode_address(new_location)
                 
-                if geo_location:
-                    print(f"DEBUG: Geocoding successful: {geo_location.latitude}, {geo_location.longitude}")
-                    
+                if coordinates:
                     # Create location data
                     location_data = {
                         'address': new_location,
                         'status': new_status,
                         'checklist': {stage: False for stage in CONCRETE_CHECKLIST},
-                        'coordinates': [geo_location.latitude, geo_location.longitude],
+                        'coordinates': coordinates,
                         'notes': '',
                         'date_added': datetime.now().strftime("%Y-%m-%d")
                     }
                     
-                    print(f"DEBUG: Created location data: {location_data}")
-                    
                     # Initialize project key in session state if needed
                     project_key = f"{selected_project} - {project_owner}"
                     if project_key not in st.session_state.project_locations:
                         st.session_state.project_locations[project_key] = []
-                        print(f"DEBUG: Initialized project_key in session state: {project_key}")
                     
                     # Save to database
-                    print("DEBUG: Attempting database save")
                     if db.add_project_location(selected_project, location_data):
-                        print("DEBUG: Database save successful")
                         st.session_state.project_locations[project_key].append(location_data)
                         st.success(f"Successfully added location: {new_location}")
                         time.sleep(0.5)
                         st.rerun()
                     else:
-                        print("ERROR: Database save failed")
                         st.error("Failed to save location to database. Please check the logs for details.")
                 else:
-                    print(f"ERROR: Geocoding failed for address: {new_location}")
                     st.error("Could not find coordinates for this address. Please verify the address is correct.")
                     
             except Exception as e:
-                print(f"ERROR: Unexpected error in location addition: {str(e)}")
-                print(f"ERROR: Error type: {type(e)}")
+                instrumentation.record('app', 'add_location', error=f"{type(e).__name__}: {str(e)}")
                 st.error(f"Error adding location: {str(e)}")
         
+        # Bulk import from a file
+        with st.expander("Bulk Import Locations"):
+            st.caption("CSV or Excel file with an Address column, and optional Status and Notes columns")
+            location_file = st.file_uploader("Location list", type=['csv', 'xlsx'], key="location_file")
+            if location_file and st.button("Import Locations"):
+                progress_bar = st.progress(0.0)
+                try:
+                    result = import_locations(
+                        db,
+                        get_geocoder().geocode,
+                        selected_project,
+                        read_location_rows(location_file, location_file.name),
+                        stages=list(PROJECT_STAGES.keys()),
+                        checklist={stage: False for stage in CONCRETE_CHECKLIST},
+                        progress=lambda done, total: progress_bar.progress(done / total)
+                    )
+                    st.success(f"Imported {result['imported']} locations")
+                    if result['failures']:
+                        st.warning(f"{len(result['failures'])} rows were not imported")
+                        st.dataframe(pd.DataFrame(result['failures']), hide_index=True)
+                    
+                    # Reload locations from database
+                    st.session_state.project_locations[project_key] = db.get_project_locations(selected_project)
+                except ImportError:
+                    st.error("Please install openpyxl to import Excel files: pip install openpyxl")
+                except Exception as e:
+                    st.error(f"Error importing locations: {str(e)}")
+        
         # Create columns for map and legend
         st.markdown("### Project Map")
         map_col1, map_col2 = st.columns([2, 1])
         
         with map_col1:
-            # Initialize map centered on New Jersey
-            m = folium.Map(location=[40.0583, -74.4057], zoom_start=8)
-            
-            # Add locations to map
-            markers = []
-            for location in st.session_state.project_locations[project_key]:
-                try:
-                    if 'coordinates' in location:
-                        # Get stage info
-                        current_stage = location.get('status', 'Not Started')
-                        stage_info = PROJECT_STAGES[current_stage]
-                        
-                        # Create popup content
-                        popup_html = f"""
-                        <div style='width: 200px'>
-                            <h4>{location['address']}</h4>
-                            <p><b>Current Stage:</b> {stage_info['icon']} {current_stage}</p>
-                            <p><b>Notes:</b> {location.get('notes', 'N/A')}</p>
-                            <p><b>Added:</b> {location.get('date_added', 'N/A')}</p>
-                        </div>
-                        """
-                        
-                        # Add marker to map
-                        folium.Marker(
-                            location=location['coordinates'],
-                            popup=folium.Popup(popup_html, max_width=300),
-                            icon=folium.Icon(color=stage_info['color'])
-                        ).add_to(m)
-                        
-                        markers.append(location['coordinates'])
-                
-                except Exception as e:
-                    st.error(f"Error adding marker for {location['address']}: {str(e)}")
+            locations = st.session_state.project_locations[project_key]
+            map_html = render_project_map(selected_project, locations_version(locations), locations)
             
-            # Fit map to markers if any exist
-            if markers:
-                m.fit_bounds(markers)
-            
-            # Display map using st_folium instead of folium_static
-            st_folium(m, width=800, height=400)
+            # A static component sends nothing back, so panning and zooming never rerun the script
+            components.html(map_html, width=800, height=400)
         
         with map_col2:
             st.markdown("### Stage Legend")
@@ -982,91 +1771,7 @@ def project_status_dashboard(spreadsheet):
         
         # Display existing locations
         st.markdown("### Project Locations")
-        for idx, location in enumerate(st.session_state.project_locations[project_key]):
-            # Ensure location has a valid status
-            if 'status' not in location or location['status'] not in PROJECT_STAGES:
-                location['status'] = 'Not Started'
-            
-            stage_info = PROJECT_STAGES[location['status']]
-            
-            with st.expander(f"{stage_info['icon']} {location['address']} - {location['status']}"):
-                col1, col2 = st.columns([1, 1])
-                
-                with col1:
-                    # Stage selection
-                    new_status = st.selectbox(
-                        "Current Stage",
-                        list(PROJECT_STAGES.keys()),
-                        key=f"status_{idx}",
-                        index=list(PROJECT_STAGES.keys()).index(location.get('status', 'Not Started'))
-                    )
-                    
-                    if new_status != location['status']:
-                        location['status'] = new_status
-                        db.update_project_location_status(
-                            project_name=selected_project,
-                            location_address=location['address'],
-                            new_status=new_status
-                        )
-                
-                with col2:
-                    # Checklist
-                    st.markdown("#### Progress Checklist")
-                    checklist_updated = False
-                    
-                    if 'checklist' not in location:
-                        location['checklist'] = {stage: False for stage in CONCRETE_CHECKLIST}
-                    
-                    for stage, info in CONCRETE_CHECKLIST.items():
-                        checked = st.checkbox(
-                            f"{info['icon']} {stage}",
-                            value=location['checklist'].get(stage, False),
-                            key=f"check_{idx}_{stage}"
-                        )
-                        if checked != location['checklist'].get(stage, False):
-                            location['checklist'][stage] = checked
-                            checklist_updated = True
-                    
-                    if checklist_updated:
-                        db.update_project_location_checklist(
-                            project_name=selected_project,
-                            location_address=location['address'],
-                            checklist=location['checklist']
-                        )
-                
-                # Calculate checklist progress
-                completed_steps = sum(1 for step in location['checklist'].values() if step)
-                total_steps = len(CONCRETE_CHECKLIST)
-                progress = completed_steps / total_steps
-                
-                st.progress(progress)
-                st.markdown(f"**Checklist Progress:** {progress * 100:.0f}%")
-                
-                # Notes section
-                new_notes = st.text_area(
-                    "Notes",
-                    value=location.get('notes', ''),
-                    key=f"notes_{idx}"
-                )
-                
-                if new_notes != location.get('notes', ''):
-                    location['notes'] = new_notes
-                    db.update_project_location_notes(
-                        project_name=selected_project,
-                        location_address=location['address'],
-                        new_notes=new_notes
-                    )
-                
-                # Delete location button
-                if st.button("Delete Location", key=f"delete_{idx}"):
-                    # Delete from database
-                    db.delete_project_location(
-                        project_name=selected_project,
-                        location_address=location['address']
-                    )
-                    # Update session state
-                    st.session_state.project_locations[project_key].pop(idx)
-                    st.rerun()
+        display_project_locations(selected_project, project_key)
         
         # Project progress
         st.markdown("### Project Progress")
@@ -1099,81 +1804,151 @@ def format_sheet_name(name):
     # Truncate to 31 characters (Google Sheets limit)
     return name[:31]
 
-def get_recent_bids(worksheet):
-    """Get recent bids from Google Sheet"""
+def get_projects():
+    """(name, owner) of every project, shared by all sessions until a project is added"""
+    return get_shared_cache().get('projects', db.get_projects)
+
+def warm_reference_data():
+    """Load what the Bid Entry page reads into memory, so renders don't wait on Sheets
+    
+    Run by the prefetcher at startup and every PREFETCH_INTERVAL seconds.
+    Everything it loads is cached by revision or data version, so a refresh
+    of unchanged data reads nothing from Sheets.
+    """
+    _, spreadsheet = get_google_services()
+    if not spreadsheet:
+        raise RuntimeError("Not connected to Google Sheets")
+    
+    sheet_ids = get_sheet_ids(spreadsheet)
+    project_sheets = [
+        format_sheet_name(project_name) for project_name, _ in get_projects()
+        if format_sheet_name(project_name) in sheet_ids
+    ]
+    sync_sheet_mirrors(spreadsheet, ["Master Sheet"] + project_sheets)
+    get_materials_from_sheet(spreadsheet)
+    get_material_stats_engine().refresh(db, "Master Sheet")
+    get_contractor_profiles(None)
+
+@st.cache_resource
+def get_prefetcher():
+    """Background refresh of the reference data, one per process"""
+    return Prefetcher(warm_reference_data)
+
+@instrumentation.traced
+def get_recent_bids(worksheet, sort_by=None, descending=False, limit=None, offset=0):
+    """Get recent bids from the local mirror of the Google Sheet, optionally one page of them"""
     try:
-        # Get raw data from worksheet
-        all_values = worksheet.get_all_values()
+        sync_sheet_mirror(worksheet.spreadsheet, worksheet.title)
         
-        if not all_values:
-            return []
-            
-        # Get headers and data
-        headers = all_values[0]
-        data = all_values[1:]
-        
-        # Create list of dictionaries
-        bids = []
-        for row in data:
-            if len(row) >= len(headers):  # Make sure row has enough columns
-                bid = dict(zip(headers, row))
-                # Clean numeric values
-                try:
-                    bid['Price'] = float(str(bid['Price']).replace('$', '').replace(',', ''))
-                    bid['Total'] = float(str(bid['Total']).replace('$', '').replace(',', ''))
-                    bid['Quantity'] = float(str(bid['Quantity']).replace(',', ''))
-                    bids.append(bid)
-                except (ValueError, KeyError) as e:
-                    continue
-                    
-        return bids
+        # Rows whose Quantity, Price or Total aren't numeric are left out
+        return db.get_sheet_rows(worksheet.title, numeric_only=True, sort_by=sort_by,
+                                 descending=descending, limit=limit, offset=offset)
         
     except Exception as e:
         st.error(f"Error loading bid history: {str(e)}")
         return []
 
 def get_contractor_profiles(worksheet):
-    """Get all contractor profiles from the sheet"""
+    """Get all contractor profiles from the local contractor index"""
     try:
-        data = worksheet.get_all_records()
-        profiles = {}
-        
-        # Get master sheet for all historical data
-        spreadsheet = worksheet.spreadsheet
-        master_sheet = spreadsheet.worksheet("Master Sheet")
-        master_data = master_sheet.get_all_records()
-        
-        # Combine current and master sheet data
-        all_data = data + master_data
-        
-        for row in all_data:
-            contractor = row.get('Contractor', '')
-            location = row.get('Location', '')
-            if contractor:
-                if contractor not in profiles:
-                    profiles[contractor] = {
-                        'locations': set(),
-                        'last_used': row.get('Date', ''),
-                        'total_bids': 0,
-                        'materials': set()
-                    }
-                if location:
-                    profiles[contractor]['locations'].add(location)
-                profiles[contractor]['total_bids'] += 1
-                if row.get('Material'):
-                    profiles[contractor]['materials'].add(row.get('Material'))
-                    
-        return profiles
+        # The index is kept up to date as bids are mirrored, so no Sheets reads
+        # here; the profiles are rebuilt only after a mirrored row changes
+        return get_shared_cache().get('contractor_profiles', db.get_contractor_profiles,
+                                      revision=db.get_data_version())
     except Exception as e:
         st.error(f"Error getting contractor profiles: {str(e)}")
         return {}
 
+def display_export_panel():
+    """Sidebar download of bids or project locations, built from the local database"""
+    with st.sidebar.expander("⬇️ Export Data"):
+        dataset = st.selectbox("Data", ["Bids", "Project locations"], key="export_dataset")
+        fmt = st.selectbox("Format", export.FORMATS, format_func=str.upper, key="export_format")
+        
+        filters = {}
+        if dataset == "Bids" and st.checkbox("Only a date range", key="export_date_range"):
+            today = datetime.today().date()
+            dates = st.date_input("Dates", (today - timedelta(days=365), today), key="export_dates")
+            if len(dates) == 2:
+                filters = {'start_date': dates[0].isoformat(), 'end_date': dates[1].isoformat()}
+        
+        name = 'bids' if dataset == "Bids" else 'locations'
+        # Built only when clicked, from SQLite; no Sheets reads. Streamlit serves
+        # downloads from memory, so very large exports belong on the command line
+        st.download_button(
+            "Download",
+            data=lambda: export.export_bytes(db, name, fmt, **filters),
+            file_name=f"{name}_{datetime.now():%Y%m%d}.{fmt}",
+            mime=export.MIME_TYPES[fmt],
+            key="export_download"
+        )
+
+def display_diagnostics(render):
+    """Sidebar panel with the calls, quota and cache lookups of the last rerun"""
+    if not st.sidebar.checkbox("Show diagnostics", key="show_diagnostics"):
+        return
+    
+    totals = render.totals()
+    sheets = totals.get('sheets', instrumentation.new_counters())
+    sqlite = totals.get('sqlite', instrumentation.new_counters())
+    cache = totals.get('cache', instrumentation.new_counters())
+    lookups = cache['hits'] + cache['misses']
+    
+    st.sidebar.markdown("### Diagnostics")
+    st.sidebar.caption(f"Rerun of {render.page or 'startup'} took {render.seconds * 1000:,.0f} ms")
+    col1, col2 = st.sidebar.columns(2)
+    col1.metric("Sheets reads", sheets['read_units'])
+    col2.metric("Sheets writes", sheets['write_units'])
+    col1.metric("SQLite queries", sqlite['calls'], f"{sqlite['seconds'] * 1000:,.1f} ms", delta_color="off")
+    col2.metric("Cache hit rate", f"{cache['hits'] / lookups:.0%}" if lookups else "n/a")
+    
+    if render.errors:
+        st.sidebar.warning("\n\n".join(render.errors[-5:]))
+    
+    rows = render.rows()
+    if rows:
+        calls = pd.DataFrame(rows)
+        calls['ms'] = calls['seconds'] * 1000
+        st.sidebar.dataframe(
+            calls[['kind', 'name', 'function', 'calls', 'ms', 'read_units', 'write_units',
+                   'hits', 'misses', 'errors']],
+            hide_index=True,
+            column_config={
+                'ms': st.column_config.NumberColumn("ms", format="%.1f"),
+                'read_units': st.column_config.NumberColumn("reads"),
+                'write_units': st.column_config.NumberColumn("writes")
+            }
+        )
+    
+    # What has spent the most quota since the app started, across all sessions
+    burners = [row for row in instrumentation.totals.rows() if row['read_units'] + row['write_units']]
+    if burners:
+        st.sidebar.caption("Sheets quota since startup")
+        st.sidebar.dataframe(
+            pd.DataFrame(burners[:10])[['page', 'function', 'name', 'read_units', 'write_units']],
+            hide_index=True
+        )
+
 def main():
+    # Every Sheets, geocoder and SQLite call in this rerun is recorded against its page
+    with instrumentation.render() as render:
+        run_page(render)
+    display_diagnostics(render)
+
+def run_page(render):
     st.title("📊 Bid Tracker")
     
     # Initialize Google services and get spreadsheet
-    drive_service, sheets_client, spreadsheet = get_google_services()
-    if not drive_service or not sheets_client:
+    sheets_client, spreadsheet = get_google_services()
+    # Sends saved bids to Sheets, including any left over from before a restart
+    get_outbox_flusher().start()
+    # Loads and refreshes reference data in the background
+    get_prefetcher().start()
+    pending, last_error = db.get_outbox_status()
+    if pending:
+        st.sidebar.caption(f"{pending} bid(s) waiting to be sent to Google Sheets"
+                           + (f" (last error: {last_error})" if last_error else ""))
+    if not sheets_client:
         st.error("Failed to initialize Google services. Please check your credentials.")
         return
         
@@ -1184,17 +1959,14 @@ def main():
     
     # Add navigation
     page = st.sidebar.radio("Navigation", ["Bid Entry", "Project Tracking", "Project Status"])
+    render.page = page
+    display_export_panel()
     
     if page == "Bid Entry":
         st.markdown("### New Bid")
         
-        # Get materials list and stats
-        materials_data = get_materials_from_sheet(spreadsheet)
-        material_list = [m['Material'] for m in materials_data if m['Material'].strip()]
-        material_stats = get_material_stats(spreadsheet)
-        
         # Add "New Project" option to project selection
-        projects = db.get_projects()
+        projects = get_projects()
         project_names = [p[0] for p in projects]
         project_choice = st.selectbox(
             "Select Project",
@@ -1229,7 +2001,7 @@ def main():
             # Display bid history for the selected project
             try:
                 sheet_name = format_sheet_name(selected_project)
-                display_bid_history(spreadsheet.worksheet(sheet_name))
+                display_bid_history(get_worksheet(spreadsheet, sheet_name), selected_project, project_owner)
             except Exception as e:
                 st.error(f"Error displaying bid history: {str(e)}")
             
@@ -1240,6 +2012,12 @@ def main():
         project_tracking_dashboard(spreadsheet)
     elif page == "Project Status":
         project_status_dashboard(spreadsheet)
+    
+    # Show how much Sheets quota is left after this render
+    quota = get_quota_remaining()
+    st.sidebar.caption(f"Sheets quota left this minute: {quota['read']} reads, {quota['write']} writes")
+    for name, remaining in quota.items():
+        instrumentation.set_gauge('sheets_quota_remaining', remaining, quota=name)
 
 if __name__ == "__main__":
     main()
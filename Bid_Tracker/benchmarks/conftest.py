@@ -0,0 +1,86 @@
+import os
+import sys
+from datetime import timedelta
+
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from fake_sheets import FakeSpreadsheet
+
+PROJECT_COUNT = 10
+MATERIALS = [("Sidewalk", "SF"), ("Curb", "LF"), ("Driveway Apron", "SY"), ("Handicap Ramp", "Unit")]
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """app2 imported from a scratch directory, so its database isn't the real one"""
+    os.chdir(tmp_path_factory.mktemp('app'))
+    import app2
+    return app2
+
+
+def bid_rows(count):
+    """Master and project sheet rows for count bids spread over PROJECT_COUNT projects"""
+    master, projects = [], {}
+    for i in range(count):
+        material, unit = MATERIALS[i % len(MATERIALS)]
+        project = f"Project {i % PROJECT_COUNT}"
+        date = f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}"
+        contractor = f"Contractor {i % 37}"
+        location = f"Town {i % 53}"
+        quantity, price = i % 40 + 1, round(5 + (i % 97) * 0.25, 2)
+        total = round(quantity * price, 2)
+        bid_id = f"bid{i:07d}"
+        master.append([date, contractor, project, "Owner", location, str(i % 9), material, unit,
+                       quantity, price, total, bid_id])
+        projects.setdefault(project, []).append([date, contractor, location, str(i % 9), material,
+                                                 unit, quantity, price, total, bid_id])
+    return master, projects
+
+
+@pytest.fixture(scope='session', params=[1_000, 10_000, 100_000], ids=['1k', '10k', '100k'])
+def dataset(request, app, tmp_path_factory):
+    """A fake spreadsheet holding size bids and a database whose mirror is in sync with it"""
+    from database import Database
+
+    size = request.param
+    spreadsheet = FakeSpreadsheet()
+    master, projects = bid_rows(size)
+    spreadsheet.add_sheet("Master Sheet", [app.MASTER_HEADERS] + master)
+    spreadsheet.add_sheet("Materials", [["Material", "Unit"]] + [list(m) for m in MATERIALS])
+
+    db = Database(str(tmp_path_factory.mktemp('db') / f'{size}.db'))
+    for project, rows in projects.items():
+        spreadsheet.add_sheet(project, [app.PROJECT_HEADERS] + rows)
+        db.add_project(project, "Owner")
+
+    # Locations for the location benchmarks, all on the first project
+    db.add_project_locations("Project 0", [
+        {'address': f"{i} Main St", 'coordinates': [40 + i * 1e-6, -74], 'checklist': {}}
+        for i in range(size)
+    ])
+    return {'size': size, 'spreadsheet': spreadsheet, 'db': db}
+
+
+@pytest.fixture
+def workload(app, dataset, monkeypatch):
+    """Point app2 at the dataset, with the mirror synced and sheet ids known
+
+    The spreadsheet revision is only checked once per test, so API call
+    counts don't depend on how long a benchmark runs.
+    """
+    monkeypatch.setattr(app, 'db', dataset['db'])
+    monkeypatch.setattr(app, 'MIRROR_SYNC_INTERVAL', timedelta(days=1))
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(days=1))
+    app.get_revision_tracker().clear()
+    app.get_shared_cache().clear()
+    app.get_material_stats_engine().reset()
+
+    spreadsheet = dataset['spreadsheet']
+    app.sync_sheet_mirrors(spreadsheet, [w.title for w in spreadsheet.sheets])
+    app.get_sheet_ids(spreadsheet)
+    spreadsheet.reset_calls()
+    return dataset
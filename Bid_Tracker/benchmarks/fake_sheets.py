@@ -0,0 +1,302 @@
+import threading
+import time
+from collections import Counter, deque
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+# Method name -> quota it counts against, matching sheets_client
+READ_CALLS = {'worksheet', 'worksheets', 'fetch_sheet_metadata', 'values_get',
+              'values_batch_get', 'get_all_values', 'get_all_records', 'row_values'}
+WRITE_CALLS = {'add_worksheet', 'del_worksheet', 'batch_update', 'append_row',
+               'append_rows', 'delete_rows', 'update_title'}
+# Drive API calls, which don't count against the Sheets quotas
+DRIVE_CALLS = {'get_lastUpdateTime'}
+
+
+class FakeResponse:
+    def __init__(self, status_code, message):
+        """Just enough of a requests.Response for gspread.exceptions.APIError"""
+        self.status_code = status_code
+        self.text = message
+
+    def json(self):
+        return {'error': {'code': self.status_code, 'message': self.text, 'status': 'RESOURCE_EXHAUSTED'}}
+
+
+def format_value(value):
+    """Render a value the way Sheets shows an unformatted cell"""
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def cell_value(cell):
+    """Value of a CellData written by batch_update"""
+    entered = cell.get('userEnteredValue', {})
+    for kind in ('stringValue', 'numberValue', 'boolValue', 'formulaValue'):
+        if kind in entered:
+            return format_value(entered[kind])
+    return ''
+
+
+def trim(rows):
+    """Drop trailing empty cells and rows, as the values API does"""
+    rows = [list(row) for row in rows]
+    for row in rows:
+        while row and row[-1] == '':
+            row.pop()
+    while rows and not rows[-1]:
+        rows.pop()
+    return rows
+
+
+class FakeSpreadsheet:
+    def __init__(self, title="Bid Results Tracker", latency=0.0,
+                 read_quota=None, write_quota=None, quota_window=60.0):
+        """In-memory stand-in for the gspread Spreadsheet surface the app uses
+
+        Every API call sleeps for latency seconds and is counted in calls. If
+        read_quota or write_quota is set, calls beyond that many per
+        quota_window seconds fail with a 429 APIError, like the real API.
+        Every write bumps revision, the spreadsheet's Drive modifiedTime.
+        """
+        self.title = title
+        self.id = 'fake-spreadsheet'
+        self.latency = latency
+        self.quotas = {'read': read_quota, 'write': write_quota}
+        self.quota_window = quota_window
+        self.history = {'read': deque(), 'write': deque()}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+        self.sheets = []
+        self.next_id = 0
+        self.revision = 0
+
+    @property
+    def api_calls(self):
+        """Total API calls made so far"""
+        return sum(self.calls.values())
+
+    def reset_calls(self):
+        self.calls.clear()
+
+    def call(self, name):
+        """Count, rate limit and delay one API call"""
+        kind = 'read' if name in READ_CALLS else 'drive' if name in DRIVE_CALLS else 'write'
+        with self.lock:
+            self.calls[name] += 1
+            if kind == 'write':
+                self.revision += 1
+            quota = self.quotas.get(kind)
+            if quota is not None:
+                now = time.monotonic()
+                history = self.history[kind]
+                while history and history[0] <= now - self.quota_window:
+                    history.popleft()
+                if len(history) >= quota:
+                    raise gspread.exceptions.APIError(FakeResponse(429, f"Quota exceeded for {kind} requests"))
+                history.append(now)
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Seeding without counting API calls
+
+    def add_sheet(self, title, rows=()):
+        """Create a worksheet holding rows, without an API call"""
+        worksheet = FakeWorksheet(self, title, self.next_id, [list(map(format_value, r)) for r in rows])
+        self.next_id += 1
+        self.sheets.append(worksheet)
+        return worksheet
+
+    def touch(self):
+        """Bump the revision without an API call, like an edit made in the Sheets UI"""
+        self.revision += 1
+
+    def find(self, title):
+        for worksheet in self.sheets:
+            if worksheet.title == title:
+                return worksheet
+        return None
+
+    def find_id(self, sheet_id):
+        for worksheet in self.sheets:
+            if worksheet.id == sheet_id:
+                return worksheet
+        raise gspread.exceptions.APIError(FakeResponse(400, f"No grid with id: {sheet_id}"))
+
+    # gspread.Spreadsheet
+
+    @property
+    def sheet1(self):
+        return self.sheets[0]
+
+    def get_lastUpdateTime(self):
+        self.call('get_lastUpdateTime')
+        return f"2024-01-01T00:00:00.{self.revision:06d}Z"
+
+    def worksheet(self, title):
+        self.call('worksheet')
+        worksheet = self.find(title)
+        if worksheet is None:
+            raise gspread.exceptions.WorksheetNotFound(title)
+        return worksheet
+
+    def worksheets(self):
+        self.call('worksheets')
+        return list(self.sheets)
+
+    def add_worksheet(self, title, rows, cols, index=None):
+        self.call('add_worksheet')
+        if self.find(title):
+            raise gspread.exceptions.APIError(FakeResponse(400, f'A sheet with the name "{title}" already exists'))
+        return self.add_sheet(title)
+
+    def del_worksheet(self, worksheet):
+        self.call('del_worksheet')
+        self.sheets.remove(worksheet)
+
+    def fetch_sheet_metadata(self, params=None):
+        self.call('fetch_sheet_metadata')
+        return {'properties': {'title': self.title}, 'sheets': [w.metadata() for w in self.sheets]}
+
+    def read_range(self, range_name):
+        """Rows of an A1 range such as 'Sheet'!A5:L"""
+        title, _, cells = range_name.partition('!')
+        if title.startswith("'"):
+            title = title[1:-1].replace("''", "'")
+        worksheet = self.find(title)
+        if worksheet is None:
+            raise gspread.exceptions.APIError(FakeResponse(400, f"Unable to parse range: {range_name}"))
+        grid = a1_range_to_grid_range(cells) if cells else {}
+        rows = worksheet.rows[grid.get('startRowIndex', 0):grid.get('endRowIndex')]
+        rows = [row[grid.get('startColumnIndex', 0):grid.get('endColumnIndex')] for row in rows]
+        return grid.get('startRowIndex', 0), trim(rows)
+
+    def values_get(self, range_name, params=None):
+        self.call('values_get')
+        _, rows = self.read_range(range_name)
+        return {'range': range_name, 'values': rows} if rows else {'range': range_name}
+
+    def values_batch_get(self, ranges, params=None):
+        self.call('values_batch_get')
+        value_ranges = []
+        for range_name in ranges:
+            _, rows = self.read_range(range_name)
+            value_ranges.append({'range': range_name, 'values': rows} if rows else {'range': range_name})
+        return {'spreadsheetId': self.id, 'valueRanges': value_ranges}
+
+    def batch_update(self, body):
+        self.call('batch_update')
+        replies = []
+        for request in body.get('requests', []):
+            if 'addSheet' in request:
+                properties = request['addSheet']['properties']
+                worksheet = self.add_sheet(properties['title'])
+                if 'sheetId' in properties:
+                    worksheet.id = properties['sheetId']
+                    self.next_id = max(self.next_id, worksheet.id + 1)
+                replies.append({'addSheet': {'properties': worksheet.metadata()['properties']}})
+            elif 'appendCells' in request:
+                worksheet = self.find_id(request['appendCells']['sheetId'])
+                for row in request['appendCells']['rows']:
+                    worksheet.rows.append([cell_value(cell) for cell in row.get('values', [])])
+                replies.append({})
+            elif 'updateCells' in request:
+                start = request['updateCells']['start']
+                worksheet = self.find_id(start['sheetId'])
+                for offset, row in enumerate(request['updateCells']['rows']):
+                    worksheet.set_cells(start['rowIndex'] + offset, start['columnIndex'],
+                                        [cell_value(cell) for cell in row.get('values', [])])
+                replies.append({})
+            elif 'deleteDimension' in request:
+                grid = request['deleteDimension']['range']
+                worksheet = self.find_id(grid['sheetId'])
+                del worksheet.rows[grid['startIndex']:grid['endIndex']]
+                replies.append({})
+            else:
+                raise NotImplementedError(f"Unsupported request: {list(request)}")
+
+        response = {'spreadsheetId': self.id, 'replies': replies}
+        if body.get('includeSpreadsheetInResponse'):
+            response['updatedSpreadsheet'] = self.spreadsheet_with_ranges(
+                body.get('responseRanges', []), body.get('responseIncludeGridData', False)
+            )
+        return response
+
+    def spreadsheet_with_ranges(self, ranges, include_grid_data):
+        """Spreadsheet resource as returned by batch_update, with the requested grid data"""
+        sheets = [worksheet.metadata() for worksheet in self.sheets]
+        if include_grid_data:
+            for range_name in ranges:
+                start, rows = self.read_range(range_name)
+                title = range_name.partition('!')[0].strip("'").replace("''", "'")
+                sheet = next(s for s in sheets if s['properties']['title'] == title)
+                sheet.setdefault('data', []).append({
+                    'startRow': start,
+                    'rowData': [{'values': [{'formattedValue': value} for value in row]} for row in rows]
+                })
+        return {'spreadsheetId': self.id, 'properties': {'title': self.title}, 'sheets': sheets}
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, sheet_id, rows):
+        """In-memory stand-in for a gspread Worksheet; cells are stored as displayed strings"""
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.id = sheet_id
+        self.rows = rows
+
+    def metadata(self):
+        return {'properties': {
+            'sheetId': self.id,
+            'title': self.title,
+            'gridProperties': {'rowCount': max(len(self.rows), 1000), 'columnCount': 26}
+        }}
+
+    def set_cells(self, row_index, column_index, values):
+        while len(self.rows) <= row_index:
+            self.rows.append([])
+        row = self.rows[row_index]
+        row.extend([''] * (column_index + len(values) - len(row)))
+        row[column_index:column_index + len(values)] = values
+
+    def get_all_values(self, **kwargs):
+        self.spreadsheet.call('get_all_values')
+        return trim(self.rows)
+
+    def get_all_records(self, **kwargs):
+        self.spreadsheet.call('get_all_records')
+        rows = trim(self.rows)
+        if not rows:
+            return []
+        headers = rows[0]
+        return [
+            {header: (row[i] if i < len(row) else '') for i, header in enumerate(headers)}
+            for row in rows[1:]
+        ]
+
+    def row_values(self, row, **kwargs):
+        self.spreadsheet.call('row_values')
+        return trim([self.rows[row - 1]])[0] if row <= len(self.rows) else []
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, **kwargs):
+        self.spreadsheet.call('append_rows')
+        first = len(trim(self.rows)) + 1
+        del self.rows[first - 1:]
+        self.rows.extend([format_value(v) for v in row] for row in values)
+        last = len(self.rows)
+        return {'updates': {'updatedRange': f"'{self.title}'!A{first}:Z{last}", 'updatedRows': len(values)}}
+
+    def delete_rows(self, start_index, end_index=None):
+        self.spreadsheet.call('delete_rows')
+        del self.rows[start_index - 1:(end_index or start_index)]
+
+    def update_title(self, title):
+        self.spreadsheet.call('update_title')
+        self.title = title
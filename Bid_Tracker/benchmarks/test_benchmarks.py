@@ -0,0 +1,557 @@
+"""Benchmarks for the app's hot paths against an in-memory spreadsheet
+
+Run from Bid_Tracker, after pip install -r benchmarks/requirements.txt, with:
+
+    pytest benchmarks --benchmark-autosave            # record a baseline
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Each benchmark stores the API calls one operation makes in extra_info and
+fails if that count goes above what the operation needs today, so a change
+that adds Sheets requests fails even when wall time looks fine.
+"""
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import tracemalloc
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import count
+
+import gspread
+import pytest
+import requests
+
+import export
+import geocoding
+import outbox
+import sheets_client
+from database import NUMERIC_ROW, Database
+from fake_sheets import FakeResponse, FakeSpreadsheet
+from location_import import import_locations
+from outbox import OutboxFlusher
+from sheets_client import is_rate_limited
+
+# Rounds for benchmarks that change the data, so the largest size stays quick
+MUTATING_ROUNDS = 20
+
+
+def measure(benchmark, spreadsheet, func, *args, setup=None, rounds=None):
+    """Benchmark func(*args), or func with arguments from setup, recording API calls per call"""
+    calls = {'invocations': 0}
+
+    def target(*args, **kwargs):
+        calls['invocations'] += 1
+        return func(*args, **kwargs)
+
+    spreadsheet.reset_calls()
+    if setup or rounds:
+        result = benchmark.pedantic(target, setup=setup, rounds=rounds or MUTATING_ROUNDS)
+    else:
+        result = benchmark(target, *args)
+    api_calls = spreadsheet.api_calls / calls['invocations']
+    benchmark.extra_info['api_calls'] = api_calls
+    benchmark.extra_info['rows'] = len(spreadsheet.find("Master Sheet").rows) - 1
+    return result, api_calls
+
+
+def test_material_stats_incremental(benchmark, app, workload):
+    spreadsheet = workload['spreadsheet']
+    app.get_material_stats(spreadsheet)
+    stats, api_calls = measure(benchmark, spreadsheet, app.get_material_stats, spreadsheet)
+    assert api_calls == 0
+    assert stats['Sidewalk']['count'] > 0
+
+
+def test_material_stats_rebuild(benchmark, app, workload):
+    spreadsheet = workload['spreadsheet']
+
+    def setup():
+        app.get_material_stats_engine().reset()
+        return (spreadsheet,), {}
+
+    stats, api_calls = measure(benchmark, spreadsheet, app.get_material_stats, setup=setup, rounds=5)
+    assert api_calls == 0
+    assert sum(s['count'] for s in stats.values()) == workload['size']
+
+
+def test_material_stats_after_update(app, workload):
+    # An edited price replaces the old one in the statistics rather than adding to them
+    spreadsheet = workload['spreadsheet']
+    row = spreadsheet.find("Master Sheet").rows[2]
+    material, price = row[6], float(row[9])
+    before = app.get_material_stats(spreadsheet)[material]
+    assert app.update_bid(spreadsheet, row[-1], {'Price': price + 1000})
+    after = app.get_material_stats(spreadsheet)[material]
+    assert after['count'] == before['count']
+    assert after['total_price'] == pytest.approx(before['total_price'] + 1000)
+    assert after['max_price'] >= price + 1000
+
+
+def test_contractor_profiles(benchmark, app, workload):
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 0")
+    profiles, api_calls = measure(benchmark, spreadsheet, app.get_contractor_profiles, worksheet)
+    assert api_calls == 0
+    assert len(profiles) == 37
+
+
+@pytest.mark.parametrize('page', ['first', 'last'])
+def test_recent_bids_page(benchmark, app, workload, page):
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 0")
+    bid_count, _ = app.db.get_sheet_totals(worksheet.title)
+    offset = 0 if page == 'first' else bid_count - app.BID_HISTORY_PAGE_SIZE
+
+    def read_page():
+        return app.get_recent_bids(worksheet, sort_by="Date", descending=True,
+                                   limit=app.BID_HISTORY_PAGE_SIZE, offset=offset)
+
+    bids, api_calls = measure(benchmark, spreadsheet, read_page)
+    assert api_calls == 0
+    assert len(bids) == app.BID_HISTORY_PAGE_SIZE
+
+
+def test_project_dashboard(benchmark, app, workload):
+    spreadsheet = workload['spreadsheet']
+    _, api_calls = measure(benchmark, spreadsheet, app.project_tracking_dashboard, spreadsheet)
+    assert api_calls == 0
+
+
+def test_project_dashboard_sync(benchmark, app, workload, monkeypatch):
+    # Every visit checks the spreadsheet revision, which is all an unchanged spreadsheet costs
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    _, api_calls = measure(benchmark, spreadsheet, app.project_tracking_dashboard, spreadsheet)
+    assert api_calls == 1
+    assert spreadsheet.calls['values_batch_get'] == 0
+
+
+def test_project_dashboard_external_edit(app, workload, monkeypatch):
+    # A bid added in the Sheets UI shows up after one read of the changed sheets
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 2")
+    worksheet.rows.append(["2024-06-01", "Contractor 1", "Town 1", "4", "Curb", "LF", "10", "12.5", "125", "new"])
+    spreadsheet.touch()
+    app.project_tracking_dashboard(spreadsheet)
+    assert spreadsheet.calls == {'get_lastUpdateTime': 1, 'values_batch_get': 1}
+    assert app.db.get_sheet_sync_state("Project 2")['row_count'] == len(worksheet.rows)
+
+
+def test_project_dashboard_external_delete(app, workload, monkeypatch):
+    # A bid deleted in the Sheets UI moves the tail, so the sheet is read and mirrored again, totals and rollups too
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 6")
+    del worksheet.rows[2]
+    spreadsheet.touch()
+    app.project_tracking_dashboard(spreadsheet)
+    assert spreadsheet.calls['values_batch_get'] == 2
+    bids = worksheet.rows[1:]
+    total = pytest.approx(sum(float(row[8]) for row in bids))
+    assert app.db.get_sheet_sync_state("Project 6")['row_count'] == len(worksheet.rows)
+    assert app.db.get_sheet_totals("Project 6") == (len(bids), total)
+    assert app.db.get_project_rollups(["Project 6"])["Project 6"][:2] == (len(bids), total)
+    assert [row['Bid ID'] for row in app.db.get_sheet_rows("Project 6")] == [row[9] for row in bids]
+
+
+def test_project_dashboard_external_update(app, workload, monkeypatch):
+    # A price changed in the Sheets UI keeps the tail in place, so it's found by the next full comparison
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 7")
+    before = app.db.get_sheet_totals("Project 7")
+    row = worksheet.rows[1]
+    added = 1000.0 - float(row[8])
+    row[7:9] = ["1000", "1000"]
+    spreadsheet.touch()
+    app.project_tracking_dashboard(spreadsheet)
+    # Read from the tail only while the mirror was recently verified
+    assert spreadsheet.calls['values_batch_get'] == 1
+    assert app.db.get_sheet_totals("Project 7") == before
+
+    monkeypatch.setattr(app, 'MIRROR_VERIFY_INTERVAL', timedelta(0))
+    spreadsheet.touch()
+    app.project_tracking_dashboard(spreadsheet)
+    assert spreadsheet.calls['values_batch_get'] == 2
+    assert app.db.get_sheet_row("Project 7", 2)['Total'] == 1000.0
+    assert app.db.get_sheet_totals("Project 7") == (before[0], pytest.approx(before[1] + added))
+
+
+def test_project_dashboard_concurrent_sync(app, workload, monkeypatch):
+    # Project sheets sync in parallel, and one failing doesn't stop the others
+    monkeypatch.setattr(app, 'DASHBOARD_SYNC_BATCH', 1)
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    values_batch_get = spreadsheet.values_batch_get
+    lock = threading.Lock()
+    reads = {'running': 0, 'most': 0}
+
+    def failing_project_3(ranges, params=None):
+        if any("Project 3" in r for r in ranges):
+            raise gspread.exceptions.APIError(FakeResponse(500, "Internal error"))
+        with lock:
+            reads['running'] += 1
+            reads['most'] = max(reads['most'], reads['running'])
+        try:
+            return values_batch_get(ranges, params)
+        finally:
+            with lock:
+                reads['running'] -= 1
+
+    monkeypatch.setattr(spreadsheet, 'values_batch_get', failing_project_3)
+    monkeypatch.setattr(spreadsheet, 'latency', 0.1)
+    for project in ("Project 2", "Project 3"):
+        spreadsheet.find(project).rows.append(["2024-06-01", "Contractor 1", "Town 1", "4", "Curb", "LF",
+                                               "10", "12.5", "125", f"{project} new"])
+    spreadsheet.touch()
+
+    app.project_tracking_dashboard(spreadsheet)
+    # Nine sheets synced, one request each, with reads overlapping
+    assert spreadsheet.calls['values_batch_get'] == 9
+    assert reads['most'] > 1
+    assert app.db.get_sheet_sync_state("Project 2")['row_count'] == len(spreadsheet.find("Project 2").rows)
+    assert app.db.get_sheet_sync_state("Project 3")['row_count'] < len(spreadsheet.find("Project 3").rows)
+
+
+def test_save_to_sheets(benchmark, app, workload):
+    # Saving a bid only writes the outbox; flushing it sends the rows for both sheets in one
+    # request, then checks the revision it created in Drive
+    spreadsheet = workload['spreadsheet']
+    flusher = OutboxFlusher(app.db, lambda entries: app.deliver_outbox_bids(spreadsheet, entries))
+    bid = ["2024-06-01", "Contractor 1", "Project 3", "Owner", "Town 1", "4",
+           "Curb", "LF", 10.0, 12.5, 125.0]
+
+    def save():
+        app.save_to_sheets(spreadsheet, bid, "Project 3")
+        return flusher.flush()
+
+    sent, api_calls = measure(benchmark, spreadsheet, save, setup=lambda: ((), {}))
+    assert sent == 1 and api_calls == 2
+    assert spreadsheet.find("Project 3").rows[-1][1] == "Contractor 1"
+
+
+def test_bulk_bid_entry(benchmark, app, workload):
+    # A 50-line bid goes to the project and master sheets with one write
+    spreadsheet = workload['spreadsheet']
+    flusher = OutboxFlusher(app.db, lambda entries: app.deliver_outbox_bids(spreadsheet, entries))
+    lines = app.empty_bulk_lines(55)
+    lines.loc[:49, 'Material'] = [f"Material {i}" for i in range(50)]
+    lines.loc[:49, 'Unit'] = "SF"
+    lines.loc[:49, 'Quantity'] = 4.0
+    lines.loc[:49, 'Price'] = 2.5
+    filled, incomplete = app.prepare_bulk_lines(lines)
+    assert incomplete == [] and len(filled) == 50 and filled['Total'].sum() == 500
+
+    def submit():
+        app.queue_bulk_bids(app.new_bid_id(), "Project 6", "Project 6", "Owner",
+                            date(2024, 6, 1), "Contractor 3", "Town 3", filled)
+        return flusher.flush()
+
+    before = len(spreadsheet.find("Project 6").rows)
+    sent, api_calls = measure(benchmark, spreadsheet, submit, setup=lambda: ((), {}), rounds=5)
+    assert sent == 1 and api_calls == 2
+    added = len(spreadsheet.find("Project 6").rows) - before
+    assert added and added % 50 == 0
+    assert spreadsheet.find("Master Sheet").rows[-1][6] == "Material 49"
+
+
+def test_own_write_not_read_back(app, workload, monkeypatch):
+    # The revision a delivered bid creates is recorded, so the next sync reads nothing back
+    monkeypatch.setattr(app, 'REVISION_CHECK_INTERVAL', timedelta(0))
+    spreadsheet = workload['spreadsheet']
+    flusher = OutboxFlusher(app.db, lambda entries: app.deliver_outbox_bids(spreadsheet, entries))
+    app.save_to_sheets(spreadsheet, ["2024-06-01", "Contractor 1", "Project 1", "Owner", "Town 1", "4",
+                                     "Curb", "LF", 10.0, 12.5, 125.0], "Project 1")
+    assert flusher.flush() == 1
+    spreadsheet.reset_calls()
+    assert app.sync_sheet_mirrors(spreadsheet, ["Master Sheet", "Project 1"])
+    assert spreadsheet.calls['values_batch_get'] == 0
+    assert app.db.get_sheet_sync_state("Master Sheet")['row_count'] == len(spreadsheet.find("Master Sheet").rows)
+
+
+def test_bulk_lines_validation(app):
+    lines = app.empty_bulk_lines(4)
+    lines.loc[0] = ["1", "Curb", "LF", 10.0, 12.5]
+    lines.loc[2] = ["", "Sidewalk", None, 5.0, 3.0]
+    filled, incomplete = app.prepare_bulk_lines(lines)
+    assert incomplete == [3]
+    assert filled['Total'].tolist() == [125.0, 15.0]
+
+
+def test_outbox_retry_after_lost_response(app, workload, monkeypatch):
+    # Sheets applied the append but the response never arrived; the retry must not add the bid again
+    monkeypatch.setattr(outbox, 'RETRY_BASE', 0)
+    monkeypatch.setattr(sheets_client, 'BACKOFF_BASE', 0)
+    spreadsheet = workload['spreadsheet']
+    # Sent through the same rate limiting and retries as in the app
+    limited = sheets_client.RateLimited(spreadsheet)
+    flusher = OutboxFlusher(app.db, lambda entries: app.deliver_outbox_bids(limited, entries))
+    batch_update = spreadsheet.batch_update
+
+    def lost_response(body):
+        batch_update(body)
+        monkeypatch.setattr(spreadsheet, 'batch_update', batch_update)
+        raise requests.exceptions.ConnectionError("Connection reset by peer")
+
+    monkeypatch.setattr(spreadsheet, 'batch_update', lost_response)
+    app.queue_bid("retried-bid", {"Project 4": [["2024-06-01", "Contractor 2", "Town 2", "1", "Curb", "LF",
+                                                 2.0, 3.0, 6.0, "retried-bid"]]},
+                  headers={"Project 4": app.PROJECT_HEADERS})
+    assert flusher.flush() == 0
+    assert flusher.flush() == 1
+    assert sum(row[-1] == "retried-bid" for row in spreadsheet.find("Project 4").rows) == 1
+    assert app.db.get_outbox_status() == (0, None)
+
+
+def test_outbox_attempt_counted_once(app, workload):
+    # A batch that fails and is then sent bid by bid is still one attempt on each bid
+    keys = [f"attempt-{uuid.uuid4()}" for _ in range(3)]
+    bad = keys[1]
+    for key in keys:
+        app.db.add_outbox_bid(key, {"Project 4": []}, {})
+
+    def deliver(entries):
+        if len(entries) > 1 or entries[0]['key'] == bad:
+            raise ValueError("Invalid value")
+
+    assert OutboxFlusher(app.db, deliver).flush() == 2
+    app.db.cursor.execute("SELECT attempts FROM bid_outbox WHERE idempotency_key = ?", (bad,))
+    assert app.db.cursor.fetchone() == (1,)
+    app.db.remove_outbox_bids([bad])
+
+
+def test_delete_row(benchmark, app, workload):
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 5")
+    before = len(worksheet.rows)
+    # Deleting the first bid shifts every row below it, the most expensive case
+    _, api_calls = measure(benchmark, spreadsheet, app.delete_row, setup=lambda: (
+        (spreadsheet, "Project 5", 0), {}
+    ))
+    # One read to check the rows are where the mirror has them, one batch_update, one revision check
+    assert api_calls == 3
+    assert len(worksheet.rows) < before
+    assert app.db.get_sheet_sync_state("Project 5")['row_count'] == len(worksheet.rows)
+
+
+def test_delete_bid_after_external_delete(app, workload):
+    # A row deleted in the Sheets UI moves the rows below it; the bid deleted is still the one asked for
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 8")
+    master = spreadsheet.find("Master Sheet")
+    removed, target = worksheet.rows[1][9], worksheet.rows[3][9]
+    del worksheet.rows[1]
+    spreadsheet.touch()
+    project_ids = [row[9] for row in worksheet.rows[1:]]
+    master_ids = [row[-1] for row in master.rows[1:]]
+    assert app.delete_bid(spreadsheet, target)
+    assert [row[9] for row in worksheet.rows[1:]] == [i for i in project_ids if i != target]
+    assert [row[-1] for row in master.rows[1:]] == [i for i in master_ids if i != target]
+    assert [row['Bid ID'] for row in app.db.get_sheet_rows("Project 8")] == [row[9] for row in worksheet.rows[1:]]
+    assert ("Project 8", removed) not in app.db.get_mirrored_bids({removed})
+
+
+def test_update_bid_after_external_delete(app, workload):
+    spreadsheet = workload['spreadsheet']
+    worksheet = spreadsheet.find("Project 9")
+    target = worksheet.rows[3][9]
+    del worksheet.rows[1]
+    spreadsheet.touch()
+    assert app.update_bid(spreadsheet, target, {'Price': 99.0})
+    prices = {row[9]: row[7] for row in worksheet.rows[1:]}
+    assert prices[target] == "99" and list(prices.values()).count("99") == 1
+    assert [app.db.get_sheet_row(*row)['Price'] for row in app.db.get_bid_rows(target)] == [99.0, 99.0]
+
+
+def test_add_project_location(benchmark, app, workload):
+    numbers = count()
+
+    def setup():
+        location = {'address': f"{next(numbers)} New Rd", 'coordinates': [40.5, -74.5], 'checklist': {}}
+        return ("Project 0", location), {}
+
+    added, api_calls = measure(benchmark, workload['spreadsheet'], app.db.add_project_location, setup=setup)
+    assert added and api_calls == 0
+
+
+def test_import_locations_unknown_project(app):
+    # Geocoded rows that can't be saved are reported row by row, not dropped
+    rows = [(2, "1 Main St", "", ""), (3, "", "", ""), (4, "2 Main St", "", "")]
+    result = import_locations(app.db, lambda address: [40.5, -74.5], "No Such Project", rows,
+                              stages=["Not Started"], checklist={})
+    assert result['imported'] == 0
+    assert [(f['Row'], f['Error']) for f in result['failures']] == [
+        (2, "Project No Such Project not found"), (3, "Missing address"), (4, "Project No Such Project not found")
+    ]
+
+
+def test_migrate_legacy_locations(tmp_path):
+    # Databases from before versioned migrations had no id column; the first of any duplicate is kept
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE project_locations (project_name TEXT, address TEXT, status TEXT,
+                                        coordinates TEXT, notes TEXT, checklist TEXT, date_added TEXT)
+    """)
+    conn.executemany("INSERT INTO project_locations VALUES (?, ?, ?, NULL, ?, NULL, NULL)", [
+        ("Legacy", "1 Main St", "Completed", "first"),
+        ("Legacy", "1 Main St", None, "second"),
+        ("Legacy", "2 Main St", None, "")
+    ])
+    conn.commit()
+    conn.close()
+    locations = Database(path).get_project_locations("Legacy")
+    assert [(l['address'], l['status'], l['notes']) for l in locations] == [
+        ("1 Main St", "Completed", "first"), ("2 Main St", "Not Started", "")
+    ]
+
+
+def test_location_exists(benchmark, app, workload):
+    size = workload['size']
+    exists, _ = measure(benchmark, workload['spreadsheet'], app.db.location_exists,
+                        setup=lambda: (("Project 0", f"{size // 2} Main St"), {}), rounds=200)
+    assert exists
+
+
+def test_update_location_status(benchmark, app, workload):
+    statuses = iter(["In Progress", "Completed"] * MUTATING_ROUNDS)
+    updated, _ = measure(benchmark, workload['spreadsheet'], app.db.update_project_location_status,
+                         setup=lambda: (("Project 0", "7 Main St", next(statuses)), {}))
+    assert updated
+
+
+def test_get_project_locations(benchmark, app, workload):
+    locations, _ = measure(benchmark, workload['spreadsheet'], app.db.get_project_locations,
+                           setup=lambda: (("Project 0",), {}), rounds=5)
+    assert len(locations) >= workload['size']
+
+
+def test_materials_shared_by_sessions(app, workload):
+    # Twenty sessions opening the app at once read the Materials sheet once between them
+    spreadsheet = workload['spreadsheet']
+    spreadsheet.latency = 0.01
+    try:
+        with ThreadPoolExecutor(20) as pool:
+            results = list(pool.map(lambda _: app.get_materials_from_sheet(spreadsheet), range(20)))
+    finally:
+        spreadsheet.latency = 0.0
+    assert all(len(materials) == 4 for materials in results)
+    assert spreadsheet.calls == {'worksheet': 1, 'get_all_values': 1}
+
+
+def test_prefetch_refresh(benchmark, app, workload, monkeypatch):
+    # Once warm, a scheduled refresh of unchanged data reads nothing from Sheets
+    spreadsheet = workload['spreadsheet']
+    monkeypatch.setattr(app, 'get_google_services', lambda: (None, spreadsheet))
+    app.warm_reference_data()
+    _, api_calls = measure(benchmark, spreadsheet, app.warm_reference_data)
+    assert api_calls == 0
+    assert app.get_shared_cache().peek('materials')
+    assert app.get_material_stats_engine().summary
+
+
+def mirrored_bid_count(db):
+    # Earlier tests add bids to the shared workload, so count what the mirror holds now
+    return db.conn.execute(
+        f"SELECT COUNT(*) FROM sheet_rows WHERE {NUMERIC_ROW} AND sheet_name != 'Master Sheet'"
+    ).fetchone()[0]
+
+
+@pytest.mark.parametrize('fmt', export.FORMATS)
+def test_export_bids(benchmark, app, workload, tmp_path, fmt):
+    # Exports read the local mirror only, a chunk at a time
+    if fmt == 'parquet':
+        pytest.importorskip('pyarrow')
+    path = tmp_path / f"bids.{fmt}"
+
+    def write():
+        with open(path, 'wb') as file:
+            return export.export(app.db, 'bids', fmt, file)
+
+    rows, api_calls = measure(benchmark, workload['spreadsheet'], write, setup=lambda: ((), {}), rounds=1)
+    assert rows == mirrored_bid_count(app.db) >= workload['size'] and api_calls == 0
+
+
+def test_export_memory(app, workload):
+    # Peak memory stays at a few chunks whatever the size of the export
+    with tempfile.TemporaryFile() as file:
+        tracemalloc.start()
+        try:
+            rows = export.export(app.db, 'bids', 'csv', file)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    assert rows == mirrored_bid_count(app.db) >= workload['size']
+    assert peak < 16 * 1024 * 1024, peak
+
+
+def test_geocode_fallback_cached_briefly(app):
+    # A town centroid found while Nominatim was down isn't kept for months
+    class Down(geocoding.GeocoderBackend):
+        name = 'down'
+
+        def geocode(self, address):
+            raise TimeoutError("Read timed out")
+
+    class Town(geocoding.GeocoderBackend):
+        name = 'town'
+
+        def geocode(self, address):
+            return [40.7357, -74.1724]
+
+    address = f"{uuid.uuid4().int % 10 ** 5} Main St, Newark NJ"
+    assert geocoding.Geocoder(app.db, [Down(), Town()]).geocode(address) == [40.7357, -74.1724]
+    cached = app.db.get_cached_geocode(geocoding.normalize_address(address))
+    assert cached['expires_at'] <= time.time() + geocoding.FALLBACK_GEOCODE_TTL.total_seconds()
+
+
+def test_normalize_address_keeps_house_numbers():
+    # Only a trailing ZIP or ZIP+4 is dropped from the cache key
+    assert geocoding.normalize_address("12345 Main St, Newark NJ 07102") == "12345 main st newark nj"
+    assert geocoding.normalize_address("12345 Main Street, Newark, New Jersey 07102-1234") == "12345 main st newark nj"
+    assert geocoding.normalize_address("Main St, Newark NJ 07102") == "main st newark nj"
+
+
+def test_quota_simulation():
+    spreadsheet = FakeSpreadsheet(read_quota=2)
+    spreadsheet.add_sheet("Sheet", [["a"]])
+    spreadsheet.values_get("Sheet")
+    spreadsheet.values_get("Sheet")
+    with pytest.raises(gspread.exceptions.APIError) as error:
+        spreadsheet.values_get("Sheet")
+    assert is_rate_limited(error.value)
+    assert spreadsheet.calls['values_get'] == 3
+
+
+def test_writes_only_retried_when_rate_limited(monkeypatch):
+    # A write that failed with a 5xx may have been applied, so only a 429 is retried
+    monkeypatch.setattr(sheets_client, 'BACKOFF_BASE', 0)
+    spreadsheet = FakeSpreadsheet()
+    spreadsheet.add_sheet("Sheet", [["a"]])
+    attempts, errors = Counter(), []
+
+    def failing(name):
+        call = getattr(spreadsheet, name)
+
+        def fail_once(*args, **kwargs):
+            attempts[name] += 1
+            if errors:
+                raise gspread.exceptions.APIError(FakeResponse(errors.pop(), "Failed"))
+            return call(*args, **kwargs)
+        monkeypatch.setattr(spreadsheet, name, fail_once)
+
+    failing('batch_update')
+    failing('values_get')
+    limited = sheets_client.RateLimited(spreadsheet)
+    errors.append(503)
+    with pytest.raises(gspread.exceptions.APIError):
+        limited.batch_update({'requests': []})
+    errors.append(429)
+    limited.batch_update({'requests': []})
+    errors.append(503)
+    limited.values_get("Sheet")
+    assert attempts == {'batch_update': 3, 'values_get': 2}
@@ -1,27 +1,497 @@
 import sqlite3
+import hashlib
+import json
+import queue
+import threading
+import time
+import weakref
+from contextlib import contextmanager
 from datetime import datetime
 
+import instrumentation
+
+DB_PATH = 'bid_tracker.db'
+
+# Idle connections kept for reuse once the thread that held one finishes
+POOL_SIZE = 8
+# How long a writer waits for another writer's lock before giving up, in seconds
+BUSY_TIMEOUT = 30
+# Applied to every pooled connection
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",   # WAL stays consistent; only the last commit can be lost on power failure
+    "PRAGMA cache_size = -16000",    # 16 MB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON"
+)
+
+# Sheet header -> mirror column for rows copied from Google Sheets
+MIRROR_COLUMNS = {
+    'Date': 'date',
+    'Contractor': 'contractor',
+    'Project Name': 'project_name',
+    'Project Owner': 'project_owner',
+    'Location': 'location',
+    'Unit Number': 'unit_number',
+    'Material': 'material',
+    'Unit': 'unit',
+    'Quantity': 'quantity',
+    'Price': 'price',
+    'Total': 'total',
+    'Bid ID': 'bid_id'
+}
+NUMERIC_COLUMNS = ('quantity', 'price', 'total')
+# Rows counted as bids in history and totals
+NUMERIC_ROW = ' AND '.join(f"{column} IS NOT NULL" for column in NUMERIC_COLUMNS)
+# Columns the contractor index keeps of each bid
+INDEXED_COLUMNS = ('contractor', 'date', 'location', 'material', 'unit', 'price')
+# Columns that identify a bid written before bid IDs existed
+LEGACY_BID_COLUMNS = ('date', 'contractor', 'location', 'material', 'quantity', 'price', 'total')
+
+def contractor_bid_key(row):
+    """Key that identifies one bid across the master and project sheets"""
+    if row.get('bid_id'):
+        return row['bid_id']
+    return '|'.join(str(row.get(column)) for column in LEGACY_BID_COLUMNS)
+
+def mirror_records(sheet_name, headers, rows, start_row):
+    """The mirror columns of a worksheet's headers, and its rows as sheet_rows records"""
+    positions = [(MIRROR_COLUMNS[h], i) for i, h in enumerate(headers) if h in MIRROR_COLUMNS]
+    records = []
+    for offset, row in enumerate(rows):
+        values = [sheet_name, start_row + offset]
+        for column, i in positions:
+            value = row[i] if i < len(row) else ''
+            values.append(parse_number(value) if column in NUMERIC_COLUMNS else str(value).strip())
+        records.append(values)
+    return [column for column, _ in positions], records
+
+def records_digest(records):
+    """Hash of sheet_rows records, to tell whether the mirror still matches a sheet"""
+    digest = hashlib.sha1()
+    for record in records:
+        digest.update(repr(tuple(record)).encode())
+    return digest.hexdigest()
+
+def parse_number(value):
+    """Parse a sheet cell like "$1,234.00" into a float, or None if it isn't numeric"""
+    try:
+        return float(str(value).replace('$', '').replace(',', ''))
+    except (ValueError, TypeError):
+        return None
+
+def create_base_schema(cursor):
+    """Schema 1: the tables that existed before versioned migrations"""
+    # Create projects table if it doesn't exist
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS projects (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            owner TEXT NOT NULL
+        )
+    """)
+
+    # Local mirror of the Google Sheets worksheets
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_sync (
+            sheet_name TEXT PRIMARY KEY,
+            headers TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 1,
+            last_synced TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sheet_rows (
+            sheet_name TEXT NOT NULL,
+            row_number INTEGER NOT NULL,
+            date TEXT,
+            contractor TEXT,
+            project_name TEXT,
+            project_owner TEXT,
+            location TEXT,
+            unit_number TEXT,
+            material TEXT,
+            unit TEXT,
+            quantity REAL,
+            price REAL,
+            total REAL,
+            bid_id TEXT,
+            PRIMARY KEY (sheet_name, row_number)
+        )
+    """)
+    # Mirrors created before bid IDs existed
+    cursor.execute("PRAGMA table_info(sheet_rows)")
+    if 'bid_id' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE sheet_rows ADD COLUMN bid_id TEXT")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_rows_material
+        ON sheet_rows (sheet_name, material, unit)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_rows_contractor
+        ON sheet_rows (sheet_name, contractor)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_rows_bid_id
+        ON sheet_rows (bid_id)
+    """)
+
+    # Contractor profiles, maintained as bids are mirrored
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractor_bids (
+            bid_key TEXT PRIMARY KEY,
+            contractor TEXT NOT NULL,
+            date TEXT,
+            location TEXT,
+            material TEXT,
+            unit TEXT,
+            price REAL
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_contractor_bids_contractor
+        ON contractor_bids (contractor, material, date)
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractor_profiles (
+            contractor TEXT PRIMARY KEY,
+            total_bids INTEGER NOT NULL,
+            last_used TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractor_locations (
+            contractor TEXT NOT NULL,
+            location TEXT NOT NULL,
+            PRIMARY KEY (contractor, location)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractor_materials (
+            contractor TEXT NOT NULL,
+            material TEXT NOT NULL,
+            bid_count INTEGER NOT NULL,
+            PRIMARY KEY (contractor, material)
+        )
+    """)
+
+    # Geocoding results keyed by normalized address
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS geocode_cache (
+            address_key TEXT PRIMARY KEY,
+            latitude REAL,
+            longitude REAL,
+            backend TEXT,
+            hits INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    """)
+
+    # Contractor and material lists
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS contractors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            location TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS materials (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def create_project_locations(cursor):
+    """Schema 2: project_locations keyed by (project, address) and tied to its project"""
+    cursor.execute("""
+        CREATE TABLE project_locations_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            project_name TEXT NOT NULL REFERENCES projects (name)
+                ON UPDATE CASCADE ON DELETE CASCADE,
+            address TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'Not Started',
+            coordinates TEXT,
+            notes TEXT NOT NULL DEFAULT '',
+            checklist TEXT NOT NULL DEFAULT '{}',
+            date_added TEXT,
+            UNIQUE (project_name, address)
+        )
+    """)
+    
+    # Carry over locations from databases that already had the table
+    cursor.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'project_locations'
+    """)
+    if cursor.fetchone():
+        # Locations whose project row is missing get one, so they aren't lost
+        cursor.execute("""
+            INSERT OR IGNORE INTO projects (name, owner)
+            SELECT DISTINCT project_name, '' FROM project_locations
+        """)
+        # Keep the first row of any duplicated address
+        cursor.execute("""
+            INSERT OR IGNORE INTO project_locations_new
+            (project_name, address, status, coordinates, notes, checklist, date_added)
+            SELECT project_name, address, COALESCE(status, 'Not Started'), coordinates,
+                   COALESCE(notes, ''), COALESCE(checklist, '{}'), date_added
+            FROM project_locations ORDER BY rowid
+        """)
+        cursor.execute("DROP TABLE project_locations")
+    cursor.execute("ALTER TABLE project_locations_new RENAME TO project_locations")
+    
+    # The unique constraint indexes (project, address) lookups; this one
+    # answers per-status counts from the index alone
+    cursor.execute("""
+        CREATE INDEX idx_project_locations_status
+        ON project_locations (project_name, status)
+    """)
+
+def create_bid_history_indexes(cursor):
+    """Schema 3: running bid totals per sheet, and indexes for paging by date or total"""
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN bid_count INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN total_value REAL NOT NULL DEFAULT 0")
+    cursor.execute(f"""
+        UPDATE sheet_sync SET
+            bid_count = (SELECT COUNT(*) FROM sheet_rows
+                         WHERE sheet_rows.sheet_name = sheet_sync.sheet_name AND {NUMERIC_ROW}),
+            total_value = (SELECT COALESCE(SUM(total), 0) FROM sheet_rows
+                           WHERE sheet_rows.sheet_name = sheet_sync.sheet_name AND {NUMERIC_ROW})
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_rows_date
+        ON sheet_rows (sheet_name, date, row_number)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_sheet_rows_total
+        ON sheet_rows (sheet_name, total, row_number)
+    """)
+
+def rebuild_project_rollups(cursor, sheet_name=None):
+    """Recompute the project rollups of one sheet, or of every sheet, from its mirrored rows"""
+    where, params = ("WHERE sheet_name = ?", (sheet_name,)) if sheet_name else ("", ())
+    cursor.execute(f"DELETE FROM project_contractor_rollups {where}", params)
+    cursor.execute(f"DELETE FROM project_rollups {where}", params)
+    cursor.execute(f"""
+        INSERT INTO project_contractor_rollups (sheet_name, contractor, bid_count, total_value, latest_date)
+        SELECT sheet_name, COALESCE(contractor, ''), COUNT(*), SUM(total), MAX(date) FROM sheet_rows
+        {where or "WHERE 1"} AND total IS NOT NULL
+        GROUP BY sheet_name, COALESCE(contractor, '')
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO project_rollups
+        (sheet_name, bid_count, total_value, contractor_count, latest_date, lowest_bidder)
+        SELECT sheet_name, SUM(bid_count), SUM(total_value), COUNT(*), MAX(latest_date),
+               (SELECT contractor FROM project_contractor_rollups AS c
+                WHERE c.sheet_name = r.sheet_name ORDER BY total_value, contractor LIMIT 1)
+        FROM project_contractor_rollups AS r {where}
+        GROUP BY sheet_name
+    """, params)
+
+def create_project_rollups(cursor):
+    """Schema 4: per-project and per-contractor bid rollups for the tracking dashboard"""
+    cursor.execute("""
+        CREATE TABLE project_rollups (
+            sheet_name TEXT PRIMARY KEY,
+            bid_count INTEGER NOT NULL,
+            total_value REAL NOT NULL,
+            contractor_count INTEGER NOT NULL,
+            latest_date TEXT,
+            lowest_bidder TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE project_contractor_rollups (
+            sheet_name TEXT NOT NULL,
+            contractor TEXT NOT NULL,
+            bid_count INTEGER NOT NULL,
+            total_value REAL NOT NULL,
+            latest_date TEXT,
+            PRIMARY KEY (sheet_name, contractor)
+        )
+    """)
+    # Lets a contractor's latest bid on a sheet be found without a scan
+    cursor.execute("DROP INDEX IF EXISTS idx_sheet_rows_contractor")
+    cursor.execute("""
+        CREATE INDEX idx_sheet_rows_contractor
+        ON sheet_rows (sheet_name, contractor, date)
+    """)
+    rebuild_project_rollups(cursor)
+
+def create_sheet_versions(cursor):
+    """Schema 5: a data version per mirrored sheet, bumped whenever its rows change"""
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+def create_sheet_revisions(cursor):
+    """Schema 6: the spreadsheet revision each mirrored sheet was last synced at"""
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN revision TEXT")
+
+def create_bid_outbox(cursor):
+    """Schema 7: bids saved locally and waiting to be appended to Google Sheets"""
+    cursor.execute("""
+        CREATE TABLE bid_outbox (
+            id INTEGER PRIMARY KEY,
+            idempotency_key TEXT NOT NULL UNIQUE,
+            sheet_rows TEXT NOT NULL,
+            headers TEXT NOT NULL,
+            created TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt TEXT,
+            last_error TEXT
+        )
+    """)
+
+def create_sheet_verification(cursor):
+    """Schema 8: when each mirrored sheet was last compared in full with Google Sheets"""
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN verified TEXT")
+
+def create_sheet_rewrites(cursor):
+    """Schema 9: the data version at which each mirrored sheet last changed other than by appending rows"""
+    cursor.execute("ALTER TABLE sheet_sync ADD COLUMN rewritten_version INTEGER")
+
+# Schema migrations in order; PRAGMA user_version records how many have been applied
+MIGRATIONS = [
+    create_base_schema,
+    create_project_locations,
+    create_bid_history_indexes,
+    create_project_rollups,
+    create_sheet_versions,
+    create_sheet_revisions,
+    create_bid_outbox,
+    create_sheet_verification,
+    create_sheet_rewrites
+]
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records each statement it runs, with its duration"""
+
+    def execute(self, sql, parameters=()):
+        return self.timed(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.timed(super().executemany, sql, seq_of_parameters)
+
+    def timed(self, execute, sql, parameters):
+        name = instrumentation.statement_name(sql)
+        start = time.perf_counter()
+        try:
+            result = execute(sql, parameters)
+        except Exception as e:
+            instrumentation.record('sqlite', name, time.perf_counter() - start, error=str(e))
+            raise
+        instrumentation.record('sqlite', name, time.perf_counter() - start)
+        return result
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose statements and commits are recorded"""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def commit(self):
+        start = time.perf_counter()
+        super().commit()
+        instrumentation.record('sqlite', 'commit', time.perf_counter() - start)
+
+class Lease:
+    def __init__(self, conn):
+        """A connection and cursor held by one thread"""
+        self.conn = conn
+        self.cursor = conn.cursor()
+
+class ConnectionPool:
+    def __init__(self, path, size=POOL_SIZE):
+        """Give each thread its own SQLite connection, reusing those of finished threads"""
+        self.path = path
+        self.idle = queue.LifoQueue(maxsize=size)
+        self.local = threading.local()
+
+    def connect(self):
+        # Autocommit mode; Database.transaction issues BEGIN and COMMIT itself
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None,
+                               check_same_thread=False, factory=InstrumentedConnection)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def lease(self):
+        """The calling thread's connection, checked out on first use"""
+        lease = getattr(self.local, 'lease', None)
+        if lease is None:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                conn = self.connect()
+            lease = Lease(conn)
+            # The connection comes back when the thread, and with it the lease, is gone
+            weakref.finalize(lease, self.release, conn)
+            self.local.lease = lease
+        return lease
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
 class Database:
-    def __init__(self):
+    def __init__(self, path=DB_PATH):
         """Initialize the database"""
+        self.pool = ConnectionPool(path)
         try:
-            self.conn = sqlite3.connect('bid_tracker.db', check_same_thread=False)
-            self.cursor = self.conn.cursor()
+            # Readers keep reading while a write is in progress; the mode is stored in the file
+            self.conn.execute("PRAGMA journal_mode = WAL")
             
-            # Create projects table if it doesn't exist
-            self.cursor.execute("""
-                CREATE TABLE IF NOT EXISTS projects (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE NOT NULL,
-                    owner TEXT NOT NULL
-                )
-            """)
+            self.create_tables()
             
-            self.conn.commit()
+            # Backfill the contractor index for mirrors synced before it existed
+            self.cursor.execute("SELECT EXISTS (SELECT 1 FROM contractor_bids)")
+            indexed = self.cursor.fetchone()[0]
+            self.cursor.execute("SELECT EXISTS (SELECT 1 FROM sheet_rows)")
+            if self.cursor.fetchone()[0] and not indexed:
+                self.rebuild_contractor_index()
             
         except Exception as e:
             print(f"Database initialization error: {str(e)}")
 
+    @property
+    def conn(self):
+        """The calling thread's connection"""
+        return self.pool.lease().conn
+
+    @property
+    def cursor(self):
+        """The calling thread's cursor"""
+        return self.pool.lease().cursor
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements as one transaction that commits once at the end
+
+        Nested uses join the outer transaction. BEGIN IMMEDIATE takes the write
+        lock up front, so concurrent writers wait their turn instead of failing
+        when a read inside the transaction turns into a write.
+        """
+        conn = self.conn
+        if conn.in_transaction:
+            yield self.cursor
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.cursor
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
     def get_projects(self):
         """Get all projects"""
         try:
@@ -48,45 +518,22 @@ class Database:
                 "INSERT INTO projects (name, owner) VALUES (?, ?)",
                 (name, owner)
             )
-            self.conn.commit()
             return True
         except Exception as e:
             print(f"Error adding project: {str(e)}")
             return False
 
     def create_tables(self):
-        cursor = self.conn.cursor()
-        
-        # Create Projects table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS projects (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                owner TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create Contractors table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS contractors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                location TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create Materials table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS materials (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        self.conn.commit()
+        """Apply pending schema migrations, each in its own transaction"""
+        while True:
+            with self.transaction() as cursor:
+                # Read inside the transaction so two processes can't apply the same migration
+                version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                if version >= len(MIGRATIONS):
+                    return
+                MIGRATIONS[version](cursor)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+            print(f"Database migrated to schema version {version + 1}")
     
     def add_contractor(self, name, location):
         cursor = self.conn.cursor()
@@ -95,7 +542,6 @@ class Database:
                 'INSERT INTO contractors (name, location) VALUES (?, ?)',
                 (name, location)
             )
-            self.conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -112,7 +558,6 @@ class Database:
                 'INSERT INTO materials (name) VALUES (?)',
                 (name,)
             )
-            self.conn.commit()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -167,49 +612,71 @@ class Database:
     def add_project_location(self, project_name, location_data):
         """Add a new location to a project"""
         try:
-            # Check if location already exists
-            if self.location_exists(project_name, location_data['address']):
-                print(f"Location {location_data['address']} already exists for project {project_name}")
-                return False
-
-            # Validate project exists
-            self.cursor.execute("SELECT id FROM projects WHERE name = ?", (project_name,))
-            if not self.cursor.fetchone():
-                print(f"Project {project_name} does not exist")
-                return False
-
-            # Print debug info
-            print(f"Adding location: {location_data}")
-            
-            # Ensure all required fields exist
-            location_data.setdefault('status', 'Not Started')
-            location_data.setdefault('notes', '')
-            location_data.setdefault('checklist', {})
-            location_data.setdefault('date_added', datetime.now().strftime("%Y-%m-%d"))
-
-            # Insert location
+            # One statement: the unique key skips addresses the project already has
+            # and the foreign key rejects unknown projects
             self.cursor.execute("""
-                INSERT OR REPLACE INTO project_locations 
+                INSERT INTO project_locations 
                 (project_name, address, status, coordinates, notes, checklist, date_added)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (project_name, address) DO NOTHING
             """, (
                 project_name,
                 location_data['address'],
-                location_data['status'],
+                location_data.get('status', 'Not Started'),
                 json.dumps(location_data['coordinates']),
-                location_data['notes'],
-                json.dumps(location_data['checklist']),
-                location_data['date_added']
+                location_data.get('notes', ''),
+                json.dumps(location_data.get('checklist', {})),
+                location_data.get('date_added', datetime.now().strftime("%Y-%m-%d"))
             ))
-            self.conn.commit()
-            print(f"Successfully added location to database")
+            if self.cursor.rowcount != 1:
+                print(f"Location {location_data['address']} already exists for project {project_name}")
+                return False
             return True
+        except sqlite3.IntegrityError:
+            print(f"Project {project_name} does not exist")
+            return False
         except Exception as e:
-            print(f"Detailed error adding project location: {str(e)}")
-            print(f"Project name: {project_name}")
-            print(f"Location data: {location_data}")
+            print(f"Error adding project location: {str(e)}")
             return False
 
+    def get_project_location_addresses(self, project_name):
+        """Get the set of addresses already added to a project"""
+        try:
+            self.cursor.execute("""
+                SELECT address FROM project_locations WHERE project_name = ?
+            """, (project_name,))
+            return {row[0] for row in self.cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting project location addresses: {str(e)}")
+            return set()
+
+    def add_project_locations(self, project_name, locations):
+        """Add many locations to a project in a single transaction, returning how many were added"""
+        try:
+            with self.transaction():
+                date_added = datetime.now().strftime("%Y-%m-%d")
+                self.cursor.executemany("""
+                    INSERT OR IGNORE INTO project_locations 
+                    (project_name, address, status, coordinates, notes, checklist, date_added)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [(
+                    project_name,
+                    location['address'],
+                    location.get('status', 'Not Started'),
+                    json.dumps(location['coordinates']),
+                    location.get('notes', ''),
+                    json.dumps(location.get('checklist', {})),
+                    location.get('date_added', date_added)
+                ) for location in locations])
+                inserted = self.cursor.rowcount
+            return inserted
+        except sqlite3.IntegrityError:
+            print(f"Project {project_name} does not exist")
+            return 0
+        except Exception as e:
+            print(f"Error adding project locations: {str(e)}")
+            return 0
+
     def update_project_location_status(self, project_name, location_address, new_status):
         """Update the status of a location"""
         try:
@@ -218,7 +685,6 @@ class Database:
                 SET status = ? 
                 WHERE project_name = ? AND address = ?
             """, (new_status, project_name, location_address))
-            self.conn.commit()
             return True
         except Exception as e:
             print(f"Error updating location status: {str(e)}")
@@ -232,12 +698,24 @@ class Database:
                 SET notes = ? 
                 WHERE project_name = ? AND address = ?
             """, (new_notes, project_name, location_address))
-            self.conn.commit()
             return True
         except Exception as e:
             print(f"Error updating location notes: {str(e)}")
             return False
 
+    def update_project_location_checklist(self, project_name, location_address, checklist):
+        """Update the checklist of a location"""
+        try:
+            self.cursor.execute("""
+                UPDATE project_locations 
+                SET checklist = ? 
+                WHERE project_name = ? AND address = ?
+            """, (json.dumps(checklist), project_name, location_address))
+            return True
+        except Exception as e:
+            print(f"Error updating location checklist: {str(e)}")
+            return False
+
     def delete_project_location(self, project_name, location_address):
         """Delete a location from a project"""
         try:
@@ -245,8 +723,769 @@ class Database:
                 DELETE FROM project_locations 
                 WHERE project_name = ? AND address = ?
             """, (project_name, location_address))
-            self.conn.commit()
             return True
         except Exception as e:
             print(f"Error deleting location: {str(e)}")
             return False
+
+    def get_data_version(self):
+        """Get the highest data version of any mirrored sheet, which changes whenever a mirrored row does"""
+        try:
+            self.cursor.execute("SELECT COALESCE(MAX(version), 0) FROM sheet_sync")
+            return self.cursor.fetchone()[0]
+        except Exception as e:
+            print(f"Error getting data version: {str(e)}")
+            return None
+
+    def get_sheet_sync_state(self, sheet_name):
+        """Get the mirrored headers, row count, last sync and full comparison times, data versions
+        and revision of a worksheet"""
+        try:
+            self.cursor.execute("""
+                SELECT headers, row_count, last_synced, version, revision, verified, rewritten_version
+                FROM sheet_sync
+                WHERE sheet_name = ?
+            """, (sheet_name,))
+            result = self.cursor.fetchone()
+            if not result:
+                return None
+            return {
+                'headers': json.loads(result[0]),
+                'row_count': result[1],
+                'last_synced': datetime.fromisoformat(result[2]) if result[2] else None,
+                'version': result[3],
+                'revision': result[4],
+                'verified': datetime.fromisoformat(result[5]) if result[5] else None,
+                'rewritten_version': result[6]
+            }
+        except Exception as e:
+            print(f"Error getting sync state: {str(e)}")
+            return None
+
+    def append_sheet_rows(self, sheet_name, headers, rows, start_row):
+        """Mirror worksheet rows, the first of which is sheet row start_row"""
+        try:
+            with self.transaction():
+                self.mirror_sheet_rows(sheet_name, headers, rows, start_row)
+            return True
+        except Exception as e:
+            print(f"Error mirroring sheet rows: {str(e)}")
+            return False
+
+    def mirror_sheet_rows(self, sheet_name, headers, rows, start_row):
+        """Write worksheet rows into the mirror; call inside a transaction"""
+        columns, records = mirror_records(sheet_name, headers, rows, start_row)
+        last_row = start_row + len(rows) - 1
+        self.cursor.execute("SELECT row_count FROM sheet_sync WHERE sheet_name = ?", (sheet_name,))
+        previous = self.cursor.fetchone()
+        self.cursor.execute("""
+            INSERT INTO sheet_sync (sheet_name, headers, row_count, last_synced)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (sheet_name) DO UPDATE SET
+                headers = excluded.headers,
+                row_count = excluded.row_count,
+                last_synced = excluded.last_synced
+        """, (sheet_name, json.dumps(headers), last_row, datetime.now().isoformat()))
+        
+        # Rows being overwritten leave the running totals before their replacements join
+        self.adjust_sheet_totals(sheet_name, start_row, last_row, -1)
+        contractors = self.adjust_project_rollups(sheet_name, start_row, last_row, -1)
+        placeholders = ', '.join('?' * (len(columns) + 2))
+        self.cursor.executemany(f"""
+            INSERT OR REPLACE INTO sheet_rows (sheet_name, row_number, {', '.join(columns)})
+            VALUES ({placeholders})
+        """, records)
+        self.adjust_sheet_totals(sheet_name, start_row, last_row, 1)
+        contractors |= self.adjust_project_rollups(sheet_name, start_row, last_row, 1)
+        self.refresh_project_rollup(sheet_name, contractors)
+        self.index_contractor_bids(
+            dict(zip(['sheet_name', 'row_number'] + columns, record)) for record in records
+        )
+        # Rows written below the last mirrored row are an append; anything else rewrites the sheet
+        if not previous or start_row <= previous[0]:
+            self.mark_sheet_rewritten(sheet_name)
+
+    def mark_sheet_rewritten(self, sheet_name):
+        """Note that the sheet's latest data version changed rows already mirrored; call inside a transaction"""
+        self.cursor.execute("""
+            UPDATE sheet_sync SET rewritten_version = version WHERE sheet_name = ?
+        """, (sheet_name,))
+
+    def replace_sheet_rows(self, sheet_name, headers, rows):
+        """Mirror a worksheet's rows from scratch, after rows were deleted or edited in Sheets
+
+        Unlike reset_sheet_mirror, the sheet keeps moving to new data
+        versions, and only bids whose rows changed are re-indexed.
+        """
+        try:
+            with self.transaction():
+                self.cursor.execute("SELECT * FROM sheet_rows WHERE sheet_name = ?", (sheet_name,))
+                columns = [d[0] for d in self.cursor.description]
+                before = [dict(zip(columns, row)) for row in self.cursor.fetchall()]
+                last_row = max((row['row_number'] for row in before), default=1)
+                
+                self.adjust_sheet_totals(sheet_name, 1, last_row, -1)
+                contractors = self.adjust_project_rollups(sheet_name, 1, last_row, -1)
+                self.cursor.execute("DELETE FROM sheet_rows WHERE sheet_name = ?", (sheet_name,))
+                self.mirror_sheet_rows(sheet_name, headers, rows, 2)
+                self.refresh_project_rollup(sheet_name, contractors)
+                self.mark_sheet_rewritten(sheet_name)
+                
+                # New rows were indexed above; bids that changed or left the sheet are re-indexed
+                self.cursor.execute("SELECT * FROM sheet_rows WHERE sheet_name = ?", (sheet_name,))
+                columns = [d[0] for d in self.cursor.description]
+                after = {}
+                for row in self.cursor.fetchall():
+                    row = dict(zip(columns, row))
+                    after.setdefault(contractor_bid_key(row), row)
+                for row in before:
+                    key = contractor_bid_key(row)
+                    current = after.get(key)
+                    if current and all(current[c] == row[c] for c in INDEXED_COLUMNS):
+                        continue
+                    if not current and self.mirror_has_bid(row):
+                        continue
+                    self.remove_contractor_bid(key)
+                    if current:
+                        self.index_contractor_bids([current])
+            return True
+        except Exception as e:
+            print(f"Error replacing mirrored rows: {str(e)}")
+            return False
+
+    def mirror_matches(self, sheet_name, headers, rows, start_row=2):
+        """Check whether the mirrored rows from start_row on hold exactly rows"""
+        try:
+            columns, records = mirror_records(sheet_name, headers, rows, start_row)
+            self.cursor.execute(f"""
+                SELECT {', '.join(['sheet_name', 'row_number'] + columns)} FROM sheet_rows
+                WHERE sheet_name = ? AND row_number BETWEEN ? AND ?
+                ORDER BY row_number
+            """, (sheet_name, start_row, start_row + len(rows) - 1))
+            return records_digest(self.cursor.fetchall()) == records_digest(records)
+        except Exception as e:
+            print(f"Error comparing mirrored rows: {str(e)}")
+            return False
+
+    def set_sheet_revision(self, sheet_names, revision):
+        """Record the spreadsheet revision that mirrored sheets are now up to date with"""
+        try:
+            self.cursor.executemany("""
+                UPDATE sheet_sync SET revision = ? WHERE sheet_name = ?
+            """, [(revision, name) for name in sheet_names])
+            return True
+        except Exception as e:
+            print(f"Error saving sheet revision: {str(e)}")
+            return False
+
+    def set_sheet_verified(self, sheet_names, verified):
+        """Record when mirrored sheets were last compared in full with Google Sheets"""
+        try:
+            self.cursor.executemany("""
+                UPDATE sheet_sync SET verified = ? WHERE sheet_name = ?
+            """, [(verified.isoformat(), name) for name in sheet_names])
+            return True
+        except Exception as e:
+            print(f"Error saving sheet verification time: {str(e)}")
+            return False
+
+    def add_outbox_bid(self, idempotency_key, sheet_rows, headers):
+        """Save a bid for the outbox flusher to send; saving the same key twice keeps the first"""
+        try:
+            self.cursor.execute("""
+                INSERT OR IGNORE INTO bid_outbox (idempotency_key, sheet_rows, headers, created)
+                VALUES (?, ?, ?, ?)
+            """, (idempotency_key, json.dumps(sheet_rows), json.dumps(headers), datetime.now().isoformat()))
+            return True
+        except Exception as e:
+            print(f"Error saving bid to outbox: {str(e)}")
+            return False
+
+    def get_outbox_bids(self, limit):
+        """Get the oldest bids due to be sent, with the attempts already made on each"""
+        try:
+            self.cursor.execute("""
+                SELECT idempotency_key, sheet_rows, headers, attempts FROM bid_outbox
+                WHERE next_attempt IS NULL OR next_attempt <= ?
+                ORDER BY id LIMIT ?
+            """, (datetime.now().isoformat(), limit))
+            return [
+                {'key': key, 'sheet_rows': json.loads(sheet_rows), 'headers': json.loads(headers),
+                 'attempts': attempts}
+                for key, sheet_rows, headers, attempts in self.cursor.fetchall()
+            ]
+        except Exception as e:
+            print(f"Error getting outbox bids: {str(e)}")
+            return []
+
+    def start_outbox_attempt(self, keys):
+        """Count an attempt on bids before sending them, so a crash mid-send is known on restart"""
+        try:
+            self.cursor.executemany("""
+                UPDATE bid_outbox SET attempts = attempts + 1 WHERE idempotency_key = ?
+            """, [(key,) for key in keys])
+            return True
+        except Exception as e:
+            print(f"Error updating outbox attempts: {str(e)}")
+            return False
+
+    def defer_outbox_bids(self, retries, error):
+        """Hold (key, next attempt time) bids back until their next attempt"""
+        try:
+            self.cursor.executemany("""
+                UPDATE bid_outbox SET next_attempt = ?, last_error = ? WHERE idempotency_key = ?
+            """, [(next_attempt.isoformat(), error, key) for key, next_attempt in retries])
+            return True
+        except Exception as e:
+            print(f"Error deferring outbox bids: {str(e)}")
+            return False
+
+    def remove_outbox_bids(self, keys):
+        """Remove bids that have reached Google Sheets"""
+        try:
+            self.cursor.executemany("""
+                DELETE FROM bid_outbox WHERE idempotency_key = ?
+            """, [(key,) for key in keys])
+            return True
+        except Exception as e:
+            print(f"Error removing outbox bids: {str(e)}")
+            return False
+
+    def get_outbox_status(self):
+        """Get how many bids are waiting to be sent and the last error sending them"""
+        try:
+            self.cursor.execute("""
+                SELECT COUNT(*), (SELECT last_error FROM bid_outbox
+                                  WHERE last_error IS NOT NULL ORDER BY id DESC LIMIT 1)
+                FROM bid_outbox
+            """)
+            return self.cursor.fetchone()
+        except Exception as e:
+            print(f"Error getting outbox status: {str(e)}")
+            return 0, None
+
+    def delete_sheet_row(self, sheet_name, row_number):
+        """Remove a mirrored row and shift the rows below it up, as Sheets does"""
+        try:
+            with self.transaction():
+                deleted = self.get_mirror_row(sheet_name, row_number)
+                self.adjust_sheet_totals(sheet_name, row_number, row_number, -1)
+                contractors = self.adjust_project_rollups(sheet_name, row_number, row_number, -1)
+                self.cursor.execute("""
+                    DELETE FROM sheet_rows WHERE sheet_name = ? AND row_number = ?
+                """, (sheet_name, row_number))
+                self.refresh_project_rollup(sheet_name, contractors)
+                # Two steps so the shift never collides with the primary key
+                self.cursor.execute("""
+                    UPDATE sheet_rows SET row_number = -(row_number - 1)
+                    WHERE sheet_name = ? AND row_number > ?
+                """, (sheet_name, row_number))
+                self.cursor.execute("""
+                    UPDATE sheet_rows SET row_number = -row_number
+                    WHERE sheet_name = ? AND row_number < 0
+                """, (sheet_name,))
+                self.cursor.execute("""
+                    UPDATE sheet_sync SET row_count = row_count - 1
+                    WHERE sheet_name = ? AND row_count >= ?
+                """, (sheet_name, row_number))
+                self.mark_sheet_rewritten(sheet_name)
+            
+                # The bid leaves the contractor index once no sheet holds it anymore
+                if deleted and not self.mirror_has_bid(deleted):
+                    self.remove_contractor_bid(contractor_bid_key(deleted))
+            return True
+        except Exception as e:
+            print(f"Error deleting mirrored row: {str(e)}")
+            return False
+
+    def update_sheet_row(self, sheet_name, row_number, changes):
+        """Apply {header: value} changes to a mirrored row"""
+        try:
+            changes = {MIRROR_COLUMNS[h]: v for h, v in changes.items() if h in MIRROR_COLUMNS}
+            if not changes:
+                return True
+            assignments = ', '.join(f"{column} = ?" for column in changes)
+            values = [parse_number(v) if c in NUMERIC_COLUMNS else str(v).strip() for c, v in changes.items()]
+            
+            with self.transaction():
+                before = self.get_mirror_row(sheet_name, row_number)
+                self.adjust_sheet_totals(sheet_name, row_number, row_number, -1)
+                contractors = self.adjust_project_rollups(sheet_name, row_number, row_number, -1)
+                self.cursor.execute(f"""
+                    UPDATE sheet_rows SET {assignments}
+                    WHERE sheet_name = ? AND row_number = ?
+                """, values + [sheet_name, row_number])
+                self.adjust_sheet_totals(sheet_name, row_number, row_number, 1)
+                contractors |= self.adjust_project_rollups(sheet_name, row_number, row_number, 1)
+                self.refresh_project_rollup(sheet_name, contractors)
+                self.mark_sheet_rewritten(sheet_name)
+            
+                # Re-index the bid under its edited values
+                if before:
+                    self.remove_contractor_bid(contractor_bid_key(before))
+                    self.index_contractor_bids([self.get_mirror_row(sheet_name, row_number)])
+            return True
+        except Exception as e:
+            print(f"Error updating mirrored row: {str(e)}")
+            return False
+
+    def get_bid_rows(self, bid_id):
+        """Get the (sheet name, row number) of every row holding a bid"""
+        try:
+            self.cursor.execute("""
+                SELECT sheet_name, row_number FROM sheet_rows WHERE bid_id = ?
+            """, (bid_id,))
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"Error looking up bid rows: {str(e)}")
+            return []
+
+    def get_mirrored_bids(self, bid_ids):
+        """Get the (sheet name, bid ID) pairs of the given bids already in the mirror"""
+        try:
+            self.cursor.execute("""
+                SELECT sheet_name, bid_id FROM sheet_rows
+                WHERE bid_id IN (SELECT value FROM json_each(?))
+            """, (json.dumps(list(bid_ids)),))
+            return set(self.cursor.fetchall())
+        except Exception as e:
+            print(f"Error looking up mirrored bids: {str(e)}")
+            return set()
+
+    def find_sheet_row(self, sheet_name, date, contractor, total):
+        """Get the first row of a sheet matching a bid's date, contractor and total"""
+        try:
+            self.cursor.execute("""
+                SELECT row_number FROM sheet_rows
+                WHERE sheet_name = ? AND contractor = ? AND date = ? AND total = ?
+                ORDER BY row_number LIMIT 1
+            """, (sheet_name, contractor, date, total))
+            result = self.cursor.fetchone()
+            return result[0] if result else None
+        except Exception as e:
+            print(f"Error finding sheet row: {str(e)}")
+            return None
+
+    def reset_sheet_mirror(self, sheet_name):
+        """Drop the mirror of a worksheet so the next sync reloads it"""
+        try:
+            with self.transaction():
+                self.cursor.execute("DELETE FROM sheet_rows WHERE sheet_name = ?", (sheet_name,))
+                self.cursor.execute("DELETE FROM sheet_sync WHERE sheet_name = ?", (sheet_name,))
+                rebuild_project_rollups(self.cursor, sheet_name)
+            return True
+        except Exception as e:
+            print(f"Error resetting sheet mirror: {str(e)}")
+            return False
+
+    def get_sheet_row(self, sheet_name, row_number):
+        """Get one mirrored row as a dictionary keyed by sheet header"""
+        rows = self.get_sheet_rows(sheet_name, row_number=row_number)
+        return rows[0] if rows else None
+
+    def get_sheet_rows(self, sheet_name, numeric_only=False, row_number=None,
+                       sort_by=None, descending=False, limit=None, offset=0):
+        """Get mirrored rows of a worksheet as dictionaries keyed by sheet header
+
+        sort_by is a sheet header; rows are otherwise in sheet order. limit and
+        offset select one page of the sorted rows.
+        """
+        try:
+            state = self.get_sheet_sync_state(sheet_name)
+            if not state:
+                return []
+            headers = [h for h in state['headers'] if h in MIRROR_COLUMNS]
+            columns = [MIRROR_COLUMNS[h] for h in headers]
+            if not columns:
+                return []
+            
+            query = f"SELECT row_number, {', '.join(columns)} FROM sheet_rows WHERE sheet_name = ?"
+            params = [sheet_name]
+            if numeric_only:
+                query += "".join(f" AND {c} IS NOT NULL" for c in columns if c in NUMERIC_COLUMNS)
+            if row_number is not None:
+                query += " AND row_number = ?"
+                params.append(row_number)
+            
+            order = " DESC" if descending else ""
+            if sort_by in MIRROR_COLUMNS:
+                query += f" ORDER BY {MIRROR_COLUMNS[sort_by]}{order}, row_number{order}"
+            else:
+                query += f" ORDER BY row_number{order}"
+            if limit is not None:
+                query += " LIMIT ? OFFSET ?"
+                params += [limit, offset]
+            self.cursor.execute(query, params)
+            
+            return [dict(zip(['Row'] + headers, row)) for row in self.cursor.fetchall()]
+        except Exception as e:
+            print(f"Error getting mirrored rows: {str(e)}")
+            return []
+
+    def get_sheet_totals(self, sheet_name):
+        """Get the number of bids on a mirrored sheet and the sum of their totals"""
+        try:
+            self.cursor.execute("""
+                SELECT bid_count, total_value FROM sheet_sync WHERE sheet_name = ?
+            """, (sheet_name,))
+            return self.cursor.fetchone() or (0, 0)
+        except Exception as e:
+            print(f"Error getting sheet totals: {str(e)}")
+            return (0, 0)
+
+    def adjust_sheet_totals(self, sheet_name, first_row, last_row, sign):
+        """Add (sign 1) or take away (sign -1) the bids in a row range from a sheet's running totals
+
+        Every change to a sheet's rows passes through here, so this also moves
+        the sheet to a new data version. Versions are unique across sheets, so
+        a sheet that is reset and mirrored again never repeats an old one.
+        """
+        rows = f"sheet_name = ? AND row_number BETWEEN ? AND ? AND {NUMERIC_ROW}"
+        self.cursor.execute(f"""
+            UPDATE sheet_sync SET
+                bid_count = bid_count + ? * (SELECT COUNT(*) FROM sheet_rows WHERE {rows}),
+                total_value = total_value + ? * (SELECT COALESCE(SUM(total), 0) FROM sheet_rows WHERE {rows}),
+                version = (SELECT MAX(version) FROM sheet_sync) + 1
+            WHERE sheet_name = ?
+        """, (sign, sheet_name, first_row, last_row, sign, sheet_name, first_row, last_row, sheet_name))
+
+    def get_material_price_rows(self, sheet_name, after_row=1):
+        """Get row number, material, unit and price of priced rows below after_row"""
+        try:
+            self.cursor.execute("""
+                SELECT row_number, material, unit, price FROM sheet_rows
+                WHERE sheet_name = ? AND row_number > ? AND material != '' AND price IS NOT NULL
+                ORDER BY row_number
+            """, (sheet_name, after_row))
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting material prices: {str(e)}")
+            return []
+
+    def get_mirror_row(self, sheet_name, row_number):
+        """Get one mirrored row as a dictionary keyed by mirror column"""
+        self.cursor.execute("""
+            SELECT * FROM sheet_rows WHERE sheet_name = ? AND row_number = ?
+        """, (sheet_name, row_number))
+        result = self.cursor.fetchone()
+        if not result:
+            return None
+        return dict(zip([d[0] for d in self.cursor.description], result))
+
+    def mirror_has_bid(self, row):
+        """Check whether any mirrored sheet still holds the bid in row"""
+        if row.get('bid_id'):
+            self.cursor.execute("SELECT EXISTS (SELECT 1 FROM sheet_rows WHERE bid_id = ?)", (row['bid_id'],))
+        else:
+            conditions = ' AND '.join(f"{column} IS ?" for column in LEGACY_BID_COLUMNS)
+            self.cursor.execute(f"SELECT EXISTS (SELECT 1 FROM sheet_rows WHERE {conditions})",
+                                [row.get(column) for column in LEGACY_BID_COLUMNS])
+        return bool(self.cursor.fetchone()[0])
+
+    def index_contractor_bids(self, rows):
+        """Add mirrored rows to the contractor index, counting each bid once"""
+        for row in rows:
+            contractor = row.get('contractor')
+            if not contractor:
+                continue
+            
+            # A bid already seen in another sheet is ignored here
+            self.cursor.execute("""
+                INSERT OR IGNORE INTO contractor_bids
+                (bid_key, contractor, date, location, material, unit, price)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (contractor_bid_key(row), contractor, row.get('date'), row.get('location'),
+                  row.get('material'), row.get('unit'), row.get('price')))
+            if self.cursor.rowcount != 1:
+                continue
+            
+            self.cursor.execute("""
+                INSERT INTO contractor_profiles (contractor, total_bids, last_used)
+                VALUES (?, 1, ?)
+                ON CONFLICT (contractor) DO UPDATE SET
+                    total_bids = total_bids + 1,
+                    last_used = MAX(COALESCE(last_used, ''), excluded.last_used)
+            """, (contractor, row.get('date') or ''))
+            if row.get('location'):
+                self.cursor.execute("""
+                    INSERT OR IGNORE INTO contractor_locations (contractor, location) VALUES (?, ?)
+                """, (contractor, row['location']))
+            if row.get('material'):
+                self.cursor.execute("""
+                    INSERT INTO contractor_materials (contractor, material, bid_count)
+                    VALUES (?, ?, 1)
+                    ON CONFLICT (contractor, material) DO UPDATE SET bid_count = bid_count + 1
+                """, (contractor, row['material']))
+
+    def remove_contractor_bid(self, bid_key):
+        """Drop a bid from the contractor index and recount its contractor"""
+        self.cursor.execute("SELECT contractor FROM contractor_bids WHERE bid_key = ?", (bid_key,))
+        result = self.cursor.fetchone()
+        if not result:
+            return
+        contractor = result[0]
+        self.cursor.execute("DELETE FROM contractor_bids WHERE bid_key = ?", (bid_key,))
+        
+        for table in ('contractor_profiles', 'contractor_locations', 'contractor_materials'):
+            self.cursor.execute(f"DELETE FROM {table} WHERE contractor = ?", (contractor,))
+        self.cursor.execute("""
+            INSERT INTO contractor_profiles (contractor, total_bids, last_used)
+            SELECT contractor, COUNT(*), MAX(COALESCE(date, '')) FROM contractor_bids
+            WHERE contractor = ? GROUP BY contractor
+        """, (contractor,))
+        self.cursor.execute("""
+            INSERT INTO contractor_locations (contractor, location)
+            SELECT DISTINCT contractor, location FROM contractor_bids
+            WHERE contractor = ? AND location != ''
+        """, (contractor,))
+        self.cursor.execute("""
+            INSERT INTO contractor_materials (contractor, material, bid_count)
+            SELECT contractor, material, COUNT(*) FROM contractor_bids
+            WHERE contractor = ? AND material != '' GROUP BY material
+        """, (contractor,))
+
+    def rebuild_contractor_index(self):
+        """Rebuild the contractor index from every mirrored row"""
+        try:
+            with self.transaction():
+                for table in ('contractor_bids', 'contractor_profiles',
+                              'contractor_locations', 'contractor_materials'):
+                    self.cursor.execute(f"DELETE FROM {table}")
+                rows = self.conn.execute("SELECT * FROM sheet_rows")
+                columns = [d[0] for d in rows.description]
+                self.index_contractor_bids(dict(zip(columns, row)) for row in rows)
+            return True
+        except Exception as e:
+            print(f"Error rebuilding contractor index: {str(e)}")
+            return False
+
+    def get_contractor_profiles(self):
+        """Get locations, materials, bid count and last bid date of every contractor"""
+        try:
+            self.cursor.execute("SELECT contractor, total_bids, last_used FROM contractor_profiles")
+            profiles = {
+                row[0]: {'total_bids': row[1], 'last_used': row[2], 'locations': set(), 'materials': set()}
+                for row in self.cursor.fetchall()
+            }
+            self.cursor.execute("SELECT contractor, location FROM contractor_locations")
+            for contractor, location in self.cursor.fetchall():
+                profiles[contractor]['locations'].add(location)
+            self.cursor.execute("SELECT contractor, material FROM contractor_materials")
+            for contractor, material in self.cursor.fetchall():
+                profiles[contractor]['materials'].add(material)
+            return profiles
+        except Exception as e:
+            print(f"Error getting contractor profiles: {str(e)}")
+            return {}
+
+    def get_contractor_price_history(self, contractor, material=None):
+        """Get (date, material, unit, price) of a contractor's bids, newest first"""
+        try:
+            query = """
+                SELECT date, material, unit, price FROM contractor_bids
+                WHERE contractor = ?
+            """
+            params = [contractor]
+            if material:
+                query += " AND material = ?"
+                params.append(material)
+            self.cursor.execute(query + " ORDER BY date DESC", params)
+            return self.cursor.fetchall()
+        except Exception as e:
+            print(f"Error getting price history: {str(e)}")
+            return []
+
+    def get_project_rollups(self, sheet_names):
+        """Get {sheet name: (bid count, total value, contractor count, latest date, lowest bidder)}"""
+        try:
+            placeholders = ', '.join('?' * len(sheet_names))
+            self.cursor.execute(f"""
+                SELECT sheet_name, bid_count, total_value, contractor_count, latest_date, lowest_bidder
+                FROM project_rollups WHERE sheet_name IN ({placeholders})
+            """, list(sheet_names))
+            return {row[0]: row[1:] for row in self.cursor.fetchall()}
+        except Exception as e:
+            print(f"Error getting project rollups: {str(e)}")
+            return {}
+
+    def get_contractor_rollups(self, sheet_names):
+        """Get {sheet name: [(contractor, bid count, total value)]}"""
+        try:
+            placeholders = ', '.join('?' * len(sheet_names))
+            self.cursor.execute(f"""
+                SELECT sheet_name, contractor, bid_count, total_value
+                FROM project_contractor_rollups WHERE sheet_name IN ({placeholders})
+                ORDER BY sheet_name, contractor
+            """, list(sheet_names))
+            breakdowns = {}
+            for sheet_name, *row in self.cursor.fetchall():
+                breakdowns.setdefault(sheet_name, []).append(tuple(row))
+            return breakdowns
+        except Exception as e:
+            print(f"Error getting contractor rollups: {str(e)}")
+            return {}
+
+    def adjust_project_rollups(self, sheet_name, first_row, last_row, sign):
+        """Add (sign 1) or take away (sign -1) the bids in a row range from a sheet's
+        contractor rollups, returning the contractors touched"""
+        self.cursor.execute("""
+            SELECT COALESCE(contractor, ''), COUNT(*), SUM(total) FROM sheet_rows
+            WHERE sheet_name = ? AND row_number BETWEEN ? AND ? AND total IS NOT NULL
+            GROUP BY COALESCE(contractor, '')
+        """, (sheet_name, first_row, last_row))
+        changes = self.cursor.fetchall()
+        for contractor, count, total in changes:
+            self.cursor.execute("""
+                INSERT INTO project_contractor_rollups (sheet_name, contractor, bid_count, total_value)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (sheet_name, contractor) DO UPDATE SET
+                    bid_count = bid_count + excluded.bid_count,
+                    total_value = total_value + excluded.total_value
+            """, (sheet_name, contractor, sign * count, sign * total))
+        return {contractor for contractor, _, _ in changes}
+
+    def refresh_project_rollup(self, sheet_name, contractors):
+        """Finish a rollup adjustment once the mirrored rows have changed"""
+        for contractor in contractors:
+            self.cursor.execute("""
+                UPDATE project_contractor_rollups SET latest_date = (
+                    SELECT date FROM sheet_rows
+                    WHERE sheet_name = ? AND contractor = ? AND total IS NOT NULL
+                    ORDER BY date DESC LIMIT 1
+                )
+                WHERE sheet_name = ? AND contractor = ?
+            """, (sheet_name, contractor, sheet_name, contractor))
+        self.cursor.execute("""
+            DELETE FROM project_contractor_rollups WHERE sheet_name = ? AND bid_count <= 0
+        """, (sheet_name,))
+        
+        # The project row is rebuilt from its contractors, so its cost doesn't grow with bids
+        self.cursor.execute("DELETE FROM project_rollups WHERE sheet_name = ?", (sheet_name,))
+        self.cursor.execute("""
+            INSERT INTO project_rollups
+            (sheet_name, bid_count, total_value, contractor_count, latest_date, lowest_bidder)
+            SELECT sheet_name, SUM(bid_count), SUM(total_value), COUNT(*), MAX(latest_date),
+                   (SELECT contractor FROM project_contractor_rollups
+                    WHERE sheet_name = ? ORDER BY total_value, contractor LIMIT 1)
+            FROM project_contractor_rollups WHERE sheet_name = ?
+            GROUP BY sheet_name
+        """, (sheet_name, sheet_name))
+
+    def rebuild_project_rollups(self, sheet_name=None):
+        """Recompute project rollups from the mirrored rows"""
+        try:
+            with self.transaction() as cursor:
+                rebuild_project_rollups(cursor, sheet_name)
+            return True
+        except Exception as e:
+            print(f"Error rebuilding project rollups: {str(e)}")
+            return False
+
+    def iter_bid_rows(self, sheet_names=None, start_date=None, end_date=None, chunk_size=5000):
+        """Yield mirrored bids in chunks of rows, ordered by sheet and row, for exports
+        
+        Rows are (sheet, row, then the MIRROR_COLUMNS in order). sheet_names
+        defaults to every project sheet; dates bound the Date column, which
+        compares as text, so only ISO dates are filtered correctly. Runs on
+        its own cursor, so other queries can be made between chunks.
+        """
+        conditions = [NUMERIC_ROW]
+        params = []
+        if sheet_names is None:
+            conditions.append("sheet_name != 'Master Sheet'")
+        else:
+            conditions.append("sheet_name IN (SELECT value FROM json_each(?))")
+            params.append(json.dumps(list(sheet_names)))
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(str(start_date))
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(str(end_date))
+        
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT sheet_name, row_number, {', '.join(MIRROR_COLUMNS.values())}
+                FROM sheet_rows WHERE {' AND '.join(conditions)}
+                ORDER BY sheet_name, row_number
+            """, params)
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            cursor.close()
+
+    def iter_project_locations(self, project_names=None, chunk_size=5000):
+        """Yield project locations in chunks of (project, address, status, latitude,
+        longitude, notes, checklist JSON, date added) rows, for exports"""
+        condition, params = "", []
+        if project_names is not None:
+            condition = "WHERE project_name IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(project_names)))
+        
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(f"""
+                SELECT project_name, address, status,
+                       json_extract(coordinates, '$[0]'), json_extract(coordinates, '$[1]'),
+                       notes, checklist, date_added
+                FROM project_locations {condition}
+                ORDER BY project_name, id
+            """, params)
+            while rows := cursor.fetchmany(chunk_size):
+                yield rows
+        finally:
+            cursor.close()
+
+    def get_cached_geocode(self, address_key):
+        """Get an unexpired geocoding result; coordinates are None for a cached miss"""
+        try:
+            self.cursor.execute("""
+                SELECT latitude, longitude, expires_at FROM geocode_cache
+                WHERE address_key = ? AND expires_at > ?
+            """, (address_key, time.time()))
+            result = self.cursor.fetchone()
+            if not result:
+                return None
+            self.cursor.execute("""
+                UPDATE geocode_cache SET hits = hits + 1 WHERE address_key = ?
+            """, (address_key,))
+            return {
+                'coordinates': [result[0], result[1]] if result[0] is not None else None,
+                'expires_at': result[2]
+            }
+        except Exception as e:
+            print(f"Error reading geocode cache: {str(e)}")
+            return None
+
+    def save_geocode(self, address_key, coordinates, backend, ttl):
+        """Cache a geocoding result, or a miss when coordinates is None"""
+        try:
+            now = time.time()
+            latitude, longitude = coordinates if coordinates else (None, None)
+            self.cursor.execute("""
+                INSERT OR REPLACE INTO geocode_cache
+                (address_key, latitude, longitude, backend, created_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (address_key, latitude, longitude, backend, now, now + ttl.total_seconds()))
+            return True
+        except Exception as e:
+            print(f"Error saving geocode: {str(e)}")
+            return False
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Bid tracker database maintenance")
+    parser.add_argument('command', choices=['rebuild-rollups', 'rebuild-contractor-index'],
+                        help="rebuild derived tables from the mirrored sheet rows")
+    parser.add_argument('--db', default=DB_PATH, help="database file")
+    args = parser.parse_args()
+    
+    db = Database(args.db)
+    if args.command == 'rebuild-rollups':
+        ok = db.rebuild_project_rollups()
+    else:
+        ok = db.rebuild_contractor_index()
+    print("Done" if ok else "Failed")
+    raise SystemExit(0 if ok else 1)
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import io
+import sys
+import tempfile
+from contextlib import redirect_stdout
+
+from database import DB_PATH, MIRROR_COLUMNS, Database
+
+# Rows read from SQLite and written per chunk; memory use depends on this, not the export size
+EXPORT_CHUNK_SIZE = 5000
+
+FORMATS = ('csv', 'xlsx', 'parquet')
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Dataset -> (header, type) of each exported column, in row order
+DATASETS = {
+    'bids': [('Sheet', 'text'), ('Row', 'int')] + [
+        (header, 'real' if column in ('quantity', 'price', 'total') else 'text')
+        for header, column in MIRROR_COLUMNS.items()
+    ],
+    'locations': [
+        ('Project', 'text'), ('Address', 'text'), ('Status', 'text'), ('Latitude', 'real'),
+        ('Longitude', 'real'), ('Notes', 'text'), ('Checklist', 'text'), ('Date Added', 'text')
+    ]
+}
+
+
+def iter_chunks(db, dataset, start_date=None, end_date=None, sheet_names=None, project_names=None,
+                chunk_size=EXPORT_CHUNK_SIZE):
+    """Chunks of rows of a dataset, read from the local database only"""
+    if dataset == 'bids':
+        return db.iter_bid_rows(sheet_names, start_date, end_date, chunk_size)
+    if dataset == 'locations':
+        return db.iter_project_locations(project_names, chunk_size)
+    raise ValueError(f"Unknown dataset: {dataset}; expected one of: {', '.join(DATASETS)}")
+
+
+def write_csv(chunks, columns, file):
+    text = io.TextIOWrapper(file, encoding='utf-8', newline='')
+    try:
+        writer = csv.writer(text)
+        writer.writerow([header for header, _ in columns])
+        for rows in chunks:
+            writer.writerows(rows)
+    finally:
+        # Leave the caller's file open
+        text.flush()
+        text.detach()
+
+
+def write_xlsx(chunks, columns, file):
+    from openpyxl import Workbook
+
+    # Write-only workbooks stream rows to disk as they are appended
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Export")
+    sheet.append([header for header, _ in columns])
+    for rows in chunks:
+        for row in rows:
+            sheet.append(row)
+    workbook.save(file)
+
+
+def write_parquet(chunks, columns, file):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+
+    types = {'text': pa.string(), 'int': pa.int64(), 'real': pa.float64()}
+    schema = pa.schema([(header, types[kind]) for header, kind in columns])
+    with pq.ParquetWriter(file, schema) as writer:
+        for rows in chunks:
+            # One row group per chunk
+            arrays = [
+                pa.array(values if kind != 'text' else [None if v is None else str(v) for v in values],
+                         type=field.type)
+                for values, field, (_, kind) in zip(zip(*rows), schema, columns)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+WRITERS = {'csv': write_csv, 'xlsx': write_xlsx, 'parquet': write_parquet}
+
+
+def export(db, dataset, fmt, file, **filters):
+    """Stream a dataset from the local database into a binary file, returning the rows written
+
+    Rows are read and written EXPORT_CHUNK_SIZE at a time, so memory use
+    doesn't grow with the size of the export, and nothing is read from
+    Google Sheets. filters are those of iter_chunks.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format: {fmt}; expected one of: {', '.join(FORMATS)}")
+    counted = {'rows': 0}
+
+    def counting(chunks):
+        for rows in chunks:
+            counted['rows'] += len(rows)
+            yield rows
+
+    WRITERS[fmt](counting(iter_chunks(db, dataset, **filters)), DATASETS[dataset], file)
+    return counted['rows']
+
+
+def export_bytes(db, dataset, fmt, **filters):
+    """An export as bytes, for st.download_button; built in a temporary file first
+
+    Streamlit keeps every download in memory: even a file object or a
+    deferred callable's result is read into bytes before it is served. So
+    the whole export is held in memory once, while it is being downloaded;
+    only building it is streamed. Use the command line for exports too
+    large for that.
+    """
+    with tempfile.TemporaryFile() as file:
+        export(db, dataset, fmt, file, **filters)
+        file.seek(0)
+        return file.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export bids or project locations from the local database")
+    parser.add_argument('dataset', choices=list(DATASETS))
+    parser.add_argument('-f', '--format', choices=FORMATS, default='csv')
+    parser.add_argument('-o', '--output', default='-', help="file to write, or - for stdout")
+    parser.add_argument('--db', default=DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--start', help="bids dated on or after this YYYY-MM-DD date")
+    parser.add_argument('--end', help="bids dated on or before this YYYY-MM-DD date")
+    parser.add_argument('--sheet', action='append', dest='sheet_names',
+                        help="only bids from this sheet; may be repeated (default: every project sheet)")
+    parser.add_argument('--project', action='append', dest='project_names',
+                        help="only locations of this project; may be repeated")
+    args = parser.parse_args(argv)
+
+    # Migration messages go to stderr, so they can't end up in an export written to stdout
+    with redirect_stdout(sys.stderr):
+        db = Database(args.db)
+    filters = dict(start_date=args.start, end_date=args.end, sheet_names=args.sheet_names,
+                   project_names=args.project_names)
+    if args.output == '-':
+        count = export(db, args.dataset, args.format, sys.stdout.buffer, **filters)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, 'wb') as file:
+            count = export(db, args.dataset, args.format, file, **filters)
+    print(f"Exported {count} {args.dataset} rows", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+import csv
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+
+import instrumentation
+
+# How long geocoding results are cached
+GEOCODE_TTL = timedelta(days=180)
+NEGATIVE_GEOCODE_TTL = timedelta(days=1)
+# Results from a fallback backend, after an earlier one failed, are retried soon
+FALLBACK_GEOCODE_TTL = timedelta(hours=1)
+
+# Bundled offline gazetteer of "<street and/or town> <state>" entries; it ships with town centroids only
+GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv')
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_DELAY = 1.0
+
+ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd',
+    'lane': 'ln', 'court': 'ct', 'place': 'pl', 'terrace': 'ter', 'highway': 'hwy',
+    'parkway': 'pkwy', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'township': 'twp', 'saint': 'st', 'mount': 'mt'
+}
+
+
+def normalize_address(address):
+    """Reduce an address to a canonical cache key"""
+    address = str(address).lower().replace('new jersey', 'nj')
+    # A trailing ZIP or ZIP+4 doesn't change which town or street an address is on;
+    # other five-digit numbers, like house numbers, are kept
+    address = re.sub(r"(?<=\D)\d{5}(-?\d{4})?\W*$", '', address)
+    words = re.sub(r"[^a-z0-9\s]", ' ', address).split()
+    return ' '.join(ABBREVIATIONS.get(w, w) for w in words)
+
+
+class GeocoderBackend:
+    """Turns an address into [latitude, longitude], or None if it can't be found"""
+    name = 'base'
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+
+class NominatimBackend(GeocoderBackend):
+    name = 'nominatim'
+
+    def __init__(self, user_agent="bid_tracker", timeout=10):
+        from geopy.geocoders import Nominatim
+        self.geolocator = Nominatim(user_agent=user_agent, timeout=timeout)
+        self.lock = threading.Lock()
+        self.last_request = 0.0
+
+    def geocode(self, address):
+        # Requests from every session are spaced out to respect the usage policy
+        with self.lock:
+            wait = self.last_request + NOMINATIM_MIN_DELAY - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                location = self.geolocator.geocode(address)
+            finally:
+                self.last_request = time.monotonic()
+        return [location.latitude, location.longitude] if location else None
+
+
+class GazetteerBackend(GeocoderBackend):
+    name = 'gazetteer'
+
+    def __init__(self, path=GAZETTEER_PATH):
+        """Offline backend matching addresses against a bundled list of streets and towns
+
+        The bundled gazetteer.csv only holds town centroids, so a street
+        address resolves to the center of its town, never to the street. Rows
+        such as "Main St Newark NJ" added to the file are matched ahead of
+        their town.
+        """
+        self.places = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                name = normalize_address(row['name'])
+                coordinates = [float(row['latitude']), float(row['longitude'])]
+                self.places[name] = coordinates
+                # Also match addresses that leave out the state
+                words = name.split()
+                if len(words) > 1 and len(words[-1]) == 2:
+                    self.places.setdefault(' '.join(words[:-1]), coordinates)
+        self.max_words = max((len(name.split()) for name in self.places), default=0)
+
+    def geocode(self, address):
+        words = normalize_address(address).split()
+        # The longest matching run of words wins, so "union city nj" beats
+        # "union" and a street entry beats its town
+        for size in range(min(self.max_words, len(words)), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                coordinates = self.places.get(' '.join(words[start:start + size]))
+                if coordinates:
+                    return list(coordinates)
+        return None
+
+
+class Geocoder:
+    def __init__(self, db, backends):
+        """Geocode through an in-memory and SQLite cache, trying backends in order on a miss"""
+        self.db = db
+        self.backends = backends
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def geocode(self, address):
+        key = normalize_address(address)
+        if not key:
+            return None
+
+        now = time.time()
+        with self.lock:
+            cached = self.memory.get(key)
+            if cached and cached[1] > now:
+                self.hits += 1
+                instrumentation.record_cache('geocode', True)
+                return cached[0]
+
+        cached = self.db.get_cached_geocode(key)
+        if cached:
+            with self.lock:
+                self.hits += 1
+                self.memory[key] = (cached['coordinates'], cached['expires_at'])
+            instrumentation.record_cache('geocode', True)
+            return cached['coordinates']
+
+        with self.lock:
+            self.misses += 1
+        instrumentation.record_cache('geocode', False)
+        coordinates, backend, failed = None, None, False
+        for candidate in self.backends:
+            try:
+                with instrumentation.timed('geocoder', candidate.name):
+                    coordinates = candidate.geocode(address)
+            except Exception as e:
+                print(f"Geocoder {candidate.name} failed: {str(e)}")
+                failed = True
+                continue
+            if coordinates:
+                backend = candidate.name
+                break
+
+        # Don't cache "not found" when a backend was unreachable rather than empty-handed,
+        # and keep a fallback's answer (such as a town centroid) only until it's back
+        if coordinates or not failed:
+            if not coordinates:
+                ttl = NEGATIVE_GEOCODE_TTL
+            else:
+                ttl = FALLBACK_GEOCODE_TTL if failed else GEOCODE_TTL
+            self.db.save_geocode(key, coordinates, backend, ttl)
+            with self.lock:
+                self.memory[key] = (coordinates, now + ttl.total_seconds())
+        return coordinates
+
+    def stats(self):
+        """Cache hits and misses since startup"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
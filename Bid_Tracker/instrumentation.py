@@ -0,0 +1,311 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache, wraps
+
+# Optional exports, written after every render
+METRICS_TEXTFILE = os.environ.get('BID_TRACKER_METRICS_TEXTFILE')  # Prometheus node_exporter textfile
+METRICS_LOG = os.environ.get('BID_TRACKER_METRICS_LOG')            # one JSON line per render
+
+METRIC_PREFIX = 'bid_tracker'
+# Page label for calls made outside a render, such as by background threads
+BACKGROUND_PAGE = 'background'
+
+# Counters kept for every (kind, name, function) a render touches
+COUNTERS = ('calls', 'seconds', 'wait_seconds', 'read_units', 'write_units', 'hits', 'misses', 'errors')
+
+current_render = ContextVar('current_render', default=None)
+current_function = ContextVar('current_function', default=None)
+
+
+def new_counters():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+class Render:
+    def __init__(self, page=None):
+        """Calls made during one Streamlit rerun, grouped by (kind, name, function)"""
+        self.page = page
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.counters = {}
+        self.errors = []
+        self.lock = threading.Lock()
+
+    def add(self, key, seconds, wait, quota, cache, error):
+        with self.lock:
+            add_counters(self.counters, key, seconds, wait, quota, cache, error)
+            if error:
+                self.errors.append(f"{key[0]} {key[1]}: {error}")
+
+    def totals(self):
+        """Counters summed over every call of the render, by kind"""
+        with self.lock:
+            totals = {}
+            for (kind, _, _), counters in self.counters.items():
+                summed = totals.setdefault(kind, new_counters())
+                for counter, value in counters.items():
+                    summed[counter] += value
+            return totals
+
+    def rows(self):
+        """One dict per (kind, name, function), the most expensive first"""
+        with self.lock:
+            rows = [
+                dict(kind=kind, name=name, function=function or '', **counters)
+                for (kind, name, function), counters in self.counters.items()
+            ]
+        return sorted(rows, key=lambda r: (r['read_units'] + r['write_units'], r['seconds']), reverse=True)
+
+    def summary(self):
+        """The render as a JSON-serializable dict"""
+        return {
+            'time': self.started.isoformat(timespec='seconds'),
+            'page': self.page or '',
+            'seconds': round(self.seconds or 0, 6),
+            'calls': self.rows(),
+            'errors': list(self.errors)
+        }
+
+
+def add_counters(table, key, seconds, wait, quota, cache, error):
+    counters = table.get(key)
+    if counters is None:
+        counters = table[key] = new_counters()
+    if cache is None:
+        counters['calls'] += 1
+        counters['seconds'] += seconds
+        counters['wait_seconds'] += wait
+    elif cache:
+        counters['hits'] += 1
+    else:
+        counters['misses'] += 1
+    if quota:
+        counters[f'{quota}_units'] += 1
+    if error:
+        counters['errors'] += 1
+
+
+class Totals:
+    def __init__(self):
+        """Counters for every page since the process started, for the exports"""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = {}   # (page, kind, name, function) -> counters
+            self.renders = {}    # page -> [render count, seconds]
+            self.gauges = {}     # (name, labels) -> value
+
+    def add(self, page, key, seconds, wait, quota, cache, error):
+        with self.lock:
+            add_counters(self.counters, (page,) + key, seconds, wait, quota, cache, error)
+
+    def add_render(self, render):
+        page = render.page or ''
+        with self.lock:
+            for key, counters in render.counters.items():
+                summed = self.counters.setdefault((page,) + key, new_counters())
+                for counter, value in counters.items():
+                    summed[counter] += value
+            renders = self.renders.setdefault(page, [0, 0.0])
+            renders[0] += 1
+            renders[1] += render.seconds
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def rows(self):
+        """One dict per (page, kind, name, function), the most quota first"""
+        with self.lock:
+            rows = [
+                dict(page=page, kind=kind, name=name, function=function or '', **counters)
+                for (page, kind, name, function), counters in self.counters.items()
+            ]
+        return sorted(rows, key=lambda r: (r['read_units'] + r['write_units'], r['seconds']), reverse=True)
+
+    def prometheus(self):
+        """Everything in the Prometheus text exposition format"""
+        with self.lock:
+            counters = sorted(self.counters.items(), key=lambda item: tuple(str(k) for k in item[0]))
+            renders = sorted(self.renders.items())
+            gauges = sorted(self.gauges.items())
+
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{format_labels(labels)} {value:g}")
+
+        def call_samples(counter, **extra):
+            return [
+                (dict(page=page or BACKGROUND_PAGE, kind=kind, name=name, function=function or '', **extra),
+                 values[counter])
+                for (page, kind, name, function), values in counters
+                if values[counter] or (counter == 'calls' and kind != 'cache')
+            ]
+
+        metric('calls_total', 'counter', "Sheets, geocoder and SQLite calls", call_samples('calls'))
+        metric('call_seconds_total', 'counter', "Time spent in those calls", call_samples('seconds'))
+        metric('quota_wait_seconds_total', 'counter', "Time spent waiting for Sheets quota",
+               call_samples('wait_seconds'))
+        metric('quota_units_total', 'counter', "Sheets requests counted against each quota",
+               call_samples('read_units', quota='read') + call_samples('write_units', quota='write'))
+        metric('cache_requests_total', 'counter', "Cache lookups by result",
+               call_samples('hits', result='hit') + call_samples('misses', result='miss'))
+        metric('errors_total', 'counter', "Calls that raised", call_samples('errors'))
+        metric('renders_total', 'counter', "Script reruns by page",
+               [({'page': page}, count) for page, (count, _) in renders])
+        metric('render_seconds_total', 'counter', "Script rerun time by page",
+               [({'page': page}, seconds) for page, (_, seconds) in renders])
+        for name in sorted({gauge for (gauge, _), _ in gauges}):
+            metric(name, 'gauge', name.replace('_', ' ').capitalize(),
+                   [(dict(labels), value) for (gauge, labels), value in gauges if gauge == name])
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{escape_label(value)}"' for key, value in labels.items()) + '}'
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+totals = Totals()
+export_lock = threading.Lock()
+
+
+def record(kind, name, seconds=0.0, wait=0.0, quota=None, cache=None, error=None):
+    """Count one call, or one cache lookup when cache is True (hit) or False (miss)
+
+    quota is 'read' or 'write' for calls that spend a unit of Sheets quota.
+    The call is charged to the innermost traced function and the current
+    render, or to the background page outside a render.
+    """
+    key = (kind, name, current_function.get())
+    render = current_render.get()
+    if render is not None:
+        render.add(key, seconds, wait, quota, cache, error)
+    else:
+        totals.add('', key, seconds, wait, quota, cache, error)
+
+
+def record_cache(name, hit):
+    record('cache', name, cache=bool(hit))
+
+
+@contextmanager
+def timed(kind, name, quota=None):
+    """Record the enclosed block as one call, with its duration and any error"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        record(kind, name, time.perf_counter() - start, quota=quota, error=str(e) or type(e).__name__)
+        raise
+    record(kind, name, time.perf_counter() - start, quota=quota)
+
+
+def traced(func):
+    """Charge calls made inside func to it, so reports show which function spent them
+
+    Traced functions called from other traced functions are reported as a
+    path, like 'save_to_sheets > batch_append_rows'.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        caller = current_function.get()
+        token = current_function.set(f"{caller} > {func.__name__}" if caller else func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            current_function.reset(token)
+    return wrapper
+
+
+@contextmanager
+def render(page=None):
+    """Collect the calls made by one rerun, then add them to the totals and exports
+
+    Nested uses, such as a fragment running as part of a full rerun, join the
+    outer render.
+    """
+    active = current_render.get()
+    if active is not None:
+        yield active
+        return
+    active = Render(page)
+    token = current_render.set(active)
+    try:
+        yield active
+    finally:
+        current_render.reset(token)
+        active.seconds = time.perf_counter() - active.start
+        totals.add_render(active)
+        export(active)
+
+
+def rendered(page):
+    """Decorator running func inside render(page), for fragments that rerun on their own"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with render(page):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def set_gauge(name, value, **labels):
+    """Export a current value, such as quota left, with the totals"""
+    totals.set_gauge(name, value, **labels)
+
+
+def export(finished):
+    """Write the Prometheus textfile and append a finished render to the JSON log, if configured"""
+    if not (METRICS_TEXTFILE or METRICS_LOG):
+        return
+    try:
+        with export_lock:
+            if METRICS_TEXTFILE:
+                # Write then rename, so the collector never reads a half-written file
+                directory = os.path.dirname(os.path.abspath(METRICS_TEXTFILE))
+                with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+                    f.write(totals.prometheus())
+                os.chmod(f.name, 0o644)
+                os.replace(f.name, METRICS_TEXTFILE)
+            if METRICS_LOG:
+                with open(METRICS_LOG, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(finished.summary()) + '\n')
+    except Exception as e:
+        print(f"Error exporting metrics: {str(e)}")
+
+
+@lru_cache(maxsize=1024)
+def statement_name(sql):
+    """Short label for a SQL statement: its verb and first table, like 'select sheet_rows'"""
+    words = sql.split(None, 1)
+    if not words:
+        return 'other'
+    table = TABLE_PATTERN.search(sql)
+    return f"{words[0].lower()} {table.group(1)}" if table else words[0].lower()
+
+
+TABLE_PATTERN = re.compile(
+    r"\b(?:FROM|INTO|UPDATE|TABLE|INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?\w+\s+ON)\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?(\w+)",
+    re.IGNORECASE
+)
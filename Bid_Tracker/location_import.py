@@ -0,0 +1,125 @@
+import contextvars
+import csv
+import io
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Column names accepted for each field, compared case-insensitively
+ADDRESS_COLUMNS = ('address', 'location', 'location name', 'site')
+STATUS_COLUMNS = ('status', 'stage')
+NOTES_COLUMNS = ('notes', 'note', 'comments')
+
+# Geocoding threads; Nominatim requests are still spaced 1s apart by its backend
+IMPORT_WORKERS = 4
+
+
+def find_column(headers, names):
+    """Index of the first header matching one of names, or None"""
+    lowered = [str(h or '').strip().lower() for h in headers]
+    for name in names:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def iter_table_rows(file, filename):
+    """Stream rows of an uploaded CSV or XLSX file as lists of strings, header first"""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            for row in workbook.active.iter_rows(values_only=True):
+                yield ['' if value is None else str(value) for value in row]
+        finally:
+            workbook.close()
+    else:
+        yield from csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+
+
+def read_location_rows(file, filename):
+    """Stream (row number, address, status, notes) from a location list file"""
+    rows = iter_table_rows(file, filename)
+    headers = next(rows, [])
+    address_col = find_column(headers, ADDRESS_COLUMNS)
+    if address_col is None:
+        raise ValueError(f"No address column found; expected one of: {', '.join(ADDRESS_COLUMNS)}")
+    status_col = find_column(headers, STATUS_COLUMNS)
+    notes_col = find_column(headers, NOTES_COLUMNS)
+
+    def cell(row, col):
+        return row[col].strip() if col is not None and col < len(row) else ''
+
+    for row_number, row in enumerate(rows, start=2):
+        yield row_number, cell(row, address_col), cell(row, status_col), cell(row, notes_col)
+
+
+def geocode_rows(geocode, rows, workers=IMPORT_WORKERS):
+    """Geocode rows on a bounded thread pool, yielding (row, coordinates, error) in order"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for row in rows:
+            # Run in a copy of the caller's context so the calls are charged to its render
+            context = contextvars.copy_context()
+            pending.append((row, pool.submit(context.run, geocode, row[1])))
+            # Keep only a few rows in flight so large files aren't read up front
+            if len(pending) >= workers * 2:
+                yield collect_result(*pending.popleft())
+        while pending:
+            yield collect_result(*pending.popleft())
+
+
+def collect_result(row, future):
+    try:
+        return row, future.result(), None
+    except Exception as e:
+        return row, None, str(e)
+
+
+def import_locations(db, geocode, project_name, rows, stages, checklist, progress=None):
+    """Geocode and insert location rows in one transaction, reporting rows that failed
+
+    rows yields (row number, address, status, notes). Unknown or blank statuses
+    fall back to the first of stages. progress, if given, is called with the
+    number of rows geocoded so far and the number to geocode.
+    """
+    existing = db.get_project_location_addresses(project_name)
+    seen = set()
+    to_geocode = []
+    failures = []
+    for row_number, address, status, notes in rows:
+        if not address:
+            failures.append({'Row': row_number, 'Address': address, 'Error': 'Missing address'})
+        elif address in existing or address in seen:
+            failures.append({'Row': row_number, 'Address': address, 'Error': 'Already added'})
+        else:
+            seen.add(address)
+            to_geocode.append((row_number, address, status, notes))
+
+    locations = []
+    for done, (row, coordinates, error) in enumerate(geocode_rows(geocode, to_geocode), start=1):
+        row_number, address, status, notes = row
+        if coordinates:
+            locations.append({
+                'address': address,
+                'status': status if status in stages else stages[0],
+                'coordinates': coordinates,
+                'notes': notes,
+                'checklist': dict(checklist)
+            })
+        else:
+            failures.append({'Row': row_number, 'Address': address,
+                             'Error': error or 'Address not found'})
+        if progress:
+            progress(done, len(to_geocode))
+
+    imported = db.add_project_locations(project_name, locations)
+    if locations and not imported:
+        # The insert failed as a whole, so every geocoded row is reported with the reason
+        if db.get_project_owner(project_name) is None:
+            error = f"Project {project_name} not found"
+        else:
+            error = "Could not be saved"
+        located = {location['address'] for location in locations}
+        failures.extend({'Row': row_number, 'Address': address, 'Error': error}
+                        for row_number, address, _, _ in to_geocode if address in located)
+    return {'imported': imported, 'failures': sorted(failures, key=lambda f: f['Row'])}
@@ -0,0 +1,108 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+PERCENTILES = [25, 50, 75]
+
+
+class MaterialStats:
+    def __init__(self):
+        """Per-material price statistics, built once and then updated as bids are appended"""
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything so the next refresh rebuilds from scratch"""
+        with self.lock:
+            self.version = None
+            self.row_count = None
+            self.prices = {}        # material -> sorted float64 array of prices
+            self.unit_counts = {}   # material -> {unit: bid count}
+            self.first_units = {}   # material -> (row number, unit) of its first bid
+            self.summary = {}
+
+    def refresh(self, db, sheet_name):
+        """Bring the statistics up to date with the mirrored rows of sheet_name
+
+        Rows appended since the last refresh are folded in; any other change
+        to the sheet's data version, such as rows edited, deleted or mirrored
+        again, rebuilds the statistics.
+        """
+        with self.lock:
+            state = db.get_sheet_sync_state(sheet_name)
+            version, rewritten, row_count = (
+                (state['version'], state['rewritten_version'], state['row_count']) if state else (None, None, 1)
+            )
+
+            if self.version is None or rewritten is None or rewritten > self.version:
+                self.reset()
+                self.build(db.get_material_price_rows(sheet_name))
+            elif version != self.version:
+                self.add(db.get_material_price_rows(sheet_name, after_row=self.row_count))
+            self.version = version
+            self.row_count = row_count
+
+            return self.summary
+
+    def build(self, rows):
+        """Compute statistics for all rows with grouped aggregation"""
+        df = pd.DataFrame.from_records(rows, columns=['row', 'material', 'unit', 'price'])
+        if df.empty:
+            return
+        df['price'] = df['price'].astype('float64')
+
+        # Sorting by material then price lets each material's prices be sliced out
+        df = df.sort_values(['material', 'price'], kind='stable', ignore_index=True)
+        materials = df['material'].to_numpy()
+        boundaries = np.flatnonzero(materials[1:] != materials[:-1]) + 1
+        starts = np.concatenate(([0], boundaries))
+        self.prices = dict(zip(materials[starts], np.split(df['price'].to_numpy(), boundaries)))
+
+        unit_counts = df.groupby(['material', 'unit'], sort=False).size()
+        for (material, unit), count in unit_counts.items():
+            self.unit_counts.setdefault(material, {})[unit] = int(count)
+
+        first = df.loc[df.groupby('material', sort=False)['row'].idxmin(), ['material', 'row', 'unit']]
+        self.first_units = {material: (row, unit) for material, row, unit in first.itertuples(index=False)}
+
+        grouped = df.groupby('material', sort=False)['price']
+        aggregates = grouped.agg(['count', 'sum', 'min', 'max'])
+        quantiles = grouped.quantile([p / 100 for p in PERCENTILES]).unstack()
+        for material, count, total, low, high in aggregates.itertuples():
+            self.summary[material] = self.describe(
+                material, int(count), total, low, high, quantiles.loc[material].to_numpy()
+            )
+
+    def add(self, rows):
+        """Fold newly appended rows into the statistics of the materials they touch"""
+        touched = set()
+        for row, material, unit, price in rows:
+            prices = self.prices.get(material, np.empty(0))
+            self.prices[material] = np.insert(prices, np.searchsorted(prices, price), price)
+            counts = self.unit_counts.setdefault(material, {})
+            counts[unit] = counts.get(unit, 0) + 1
+            if material not in self.first_units or row < self.first_units[material][0]:
+                self.first_units[material] = (row, unit)
+            touched.add(material)
+
+        for material in touched:
+            prices = self.prices[material]
+            self.summary[material] = self.describe(
+                material, len(prices), prices.sum(), prices[0], prices[-1],
+                np.percentile(prices, PERCENTILES)
+            )
+
+    def describe(self, material, count, total, low, high, percentiles):
+        unit_counts = self.unit_counts[material]
+        return {
+            'units': set(unit_counts),
+            'count': count,
+            'total_price': float(total),
+            'avg_price': float(total) / count,
+            'min_price': float(low),
+            'max_price': float(high),
+            'percentiles': dict(zip(PERCENTILES, (float(p) for p in percentiles))),
+            'most_common_unit': max(unit_counts, key=unit_counts.get),
+            'default_unit': self.first_units[material][1]
+        }
@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timedelta
+
+import instrumentation
+from sheets_client import is_rate_limited
+
+# Bids appended to Sheets per batch_update
+FLUSH_BATCH_SIZE = 50
+# Seconds between outbox checks when no new bid wakes the flusher
+FLUSH_INTERVAL = 15
+# Backoff between attempts on a bid that failed to send, in seconds
+RETRY_BASE = 5
+RETRY_MAX = 600
+
+
+class OutboxFlusher:
+    def __init__(self, db, deliver, interval=FLUSH_INTERVAL, batch_size=FLUSH_BATCH_SIZE):
+        """Background thread draining the bid outbox to Google Sheets
+
+        deliver(entries) appends a batch of outbox entries to Sheets, skipping
+        any an earlier attempt already got there, and raises if it couldn't.
+        Sent entries are removed; failed ones are retried with exponential
+        backoff and never dropped.
+        """
+        self.db = db
+        self.deliver = deliver
+        self.interval = interval
+        self.batch_size = batch_size
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        """Start the flusher thread, once; bids left over from a previous run go first"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='bid-outbox', daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        """Flush now instead of at the next interval, such as right after a bid is saved"""
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing bid outbox: {str(e)}")
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def flush(self):
+        """Send every due bid, a batch at a time, and return how many were sent"""
+        with self.lock:
+            sent = 0
+            while True:
+                entries = self.db.get_outbox_bids(self.batch_size)
+                if not entries:
+                    break
+                failed = self.send(entries)
+                sent += len(entries) - failed
+                if failed:
+                    break
+            pending, _ = self.db.get_outbox_status()
+            instrumentation.set_gauge('outbox_pending_bids', pending)
+            return sent
+
+    def send(self, entries):
+        """Deliver entries and return how many failed, counting one attempt on each"""
+        self.db.start_outbox_attempt([entry['key'] for entry in entries])
+        return self.attempt(entries)
+
+    def attempt(self, entries):
+        try:
+            self.deliver(entries)
+        except Exception as e:
+            if len(entries) > 1 and not is_rate_limited(e):
+                # One at a time, so a bid Sheets rejects can't hold up the rest;
+                # part of the same attempt, and since the batch may have reached
+                # Sheets, each is checked first
+                return sum(self.attempt([entry]) for entry in entries)
+            now = datetime.now()
+            self.db.defer_outbox_bids([
+                (entry['key'], now + timedelta(seconds=min(RETRY_BASE * 2 ** entry['attempts'], RETRY_MAX)))
+                for entry in entries
+            ], str(e) or type(e).__name__)
+            return len(entries)
+        self.db.remove_outbox_bids([entry['key'] for entry in entries])
+        return 0
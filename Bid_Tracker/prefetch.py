@@ -0,0 +1,56 @@
+import threading
+import time
+
+import instrumentation
+
+# Seconds between refreshes of the reference data
+PREFETCH_INTERVAL = 30
+
+
+class Prefetcher:
+    def __init__(self, refresh, interval=PREFETCH_INTERVAL):
+        """Background thread loading reference data at startup and refreshing it on a schedule
+
+        refresh() loads everything renders read into the shared caches, so
+        renders find it in memory instead of waiting on Sheets. A failed
+        refresh is logged and tried again at the next interval.
+        """
+        self.refresh = refresh
+        self.interval = interval
+        self.ready = threading.Event()   # set after the first successful refresh
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.last_refresh = None
+        self.last_error = None
+
+    def start(self):
+        """Start the refresh thread, once"""
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='prefetch', daemon=True)
+                self.thread.start()
+
+    def wake(self):
+        """Refresh now instead of at the next interval"""
+        self.wakeup.set()
+
+    def run(self):
+        while True:
+            self.refresh_now()
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def refresh_now(self):
+        """Run one refresh, returning whether it succeeded"""
+        try:
+            self.refresh()
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            print(f"Error prefetching reference data: {self.last_error}")
+            return False
+        self.last_refresh = time.time()
+        self.last_error = None
+        self.ready.set()
+        instrumentation.set_gauge('prefetch_last_success_timestamp_seconds', self.last_refresh)
+        return True
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+
+import instrumentation
+
+# Entries kept for all sessions, least recently used dropped first
+MAX_ENTRIES = 256
+
+
+class SharedCache:
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """Sheets data shared by every session, each entry with its own TTL and revision
+
+        Loads are single-flight: sessions asking for a key that is already
+        being loaded wait for that load instead of starting their own, so any
+        number of users opening the app at once cost one read per key.
+        """
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # key -> (value, monotonic expiry or None, revision)
+        self.loading = {}              # key -> Event set when its load finishes
+        self.generations = {}          # key -> times invalidated, to drop loads that raced a write
+        self.lock = threading.Lock()
+
+    def get(self, key, load, ttl=None, revision=None):
+        """The value of key, calling load() for it when missing, expired or at another revision
+
+        ttl is in seconds; None keeps the entry until it is invalidated,
+        evicted or its revision changes. A load returning None isn't cached,
+        so failed loads are retried by the next caller.
+        """
+        while True:
+            with self.lock:
+                entry = self.entries.get(key)
+                if entry is not None and entry[2] == revision and (entry[1] is None or time.monotonic() < entry[1]):
+                    self.entries.move_to_end(key)
+                    instrumentation.record_cache(cache_name(key), True)
+                    return entry[0]
+                loading = self.loading.get(key)
+                if loading is None:
+                    loading = self.loading[key] = threading.Event()
+                    generation = self.generations.get(key, 0)
+                    break
+            loading.wait()
+
+        instrumentation.record_cache(cache_name(key), False)
+        try:
+            value = load()
+            if value is not None:
+                with self.lock:
+                    if self.generations.get(key, 0) == generation:
+                        self.store(key, value, ttl, revision)
+            return value
+        finally:
+            with self.lock:
+                self.loading.pop(key).set()
+
+    def peek(self, key):
+        """The last value loaded for key, however old, or None; never loads
+
+        For renders that read data a background refresh keeps current.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+        instrumentation.record_cache(cache_name(key), entry is not None)
+        return entry[0] if entry is not None else None
+
+    def set(self, key, value, ttl=None, revision=None):
+        """Replace the value of key, such as with data a write just returned"""
+        with self.lock:
+            self.generations[key] = self.generations.get(key, 0) + 1
+            self.store(key, value, ttl, revision)
+
+    def store(self, key, value, ttl, revision):
+        self.entries[key] = (value, None if ttl is None else time.monotonic() + ttl, revision)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, name):
+        """Drop the entry name and every (name, ...) tuple key, after a write changes them"""
+        with self.lock:
+            for key in [k for k in self.entries if k == name or (isinstance(k, tuple) and k[0] == name)]:
+                del self.entries[key]
+            for key in [k for k in self.loading if k == name or (isinstance(k, tuple) and k[0] == name)]:
+                self.generations[key] = self.generations.get(key, 0) + 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.generations.clear()
+
+
+def cache_name(key):
+    """Label for a key in the instrumentation, such as 'worksheet' for ('worksheet', 'Materials')"""
+    return key[0] if isinstance(key, tuple) else key
@@ -0,0 +1,192 @@
+import random
+import threading
+import time
+from functools import wraps
+
+import gspread
+import requests
+
+import instrumentation
+
+# Google Sheets API quota per service account, per minute
+READ_REQUESTS_PER_MINUTE = 60
+WRITE_REQUESTS_PER_MINUTE = 60
+
+# Retry settings for 429 responses, and 5xx and connection errors on reads
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# gspread methods that hit the API, split by the quota they count against
+READ_METHODS = {
+    'open', 'open_by_key', 'open_by_url', 'list_spreadsheet_files',
+    'worksheet', 'worksheets', 'fetch_sheet_metadata', 'values_get',
+    'values_batch_get', 'get', 'batch_get', 'get_values', 'get_all_values',
+    'get_all_records', 'row_values', 'col_values', 'acell', 'cell',
+    'find', 'findall'
+}
+WRITE_METHODS = {
+    'create', 'share', 'add_worksheet', 'del_worksheet', 'batch_update',
+    'values_update', 'values_append', 'values_batch_update', 'values_clear',
+    'append_row', 'append_rows', 'insert_row', 'insert_rows', 'delete_rows',
+    'update', 'update_cell', 'update_cells', 'update_title', 'clear', 'batch_clear'
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds=60, quota=None):
+        """Allow capacity requests per per_seconds, refilling continuously
+
+        quota names the Sheets quota ('read' or 'write') the bucket guards.
+        """
+        self.quota = quota
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take a token, waiting in line until one is available"""
+        with self.lock:
+            self._refill()
+            # Reserve the token now so concurrent callers queue behind us
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def remaining(self):
+        """Tokens available right now"""
+        with self.lock:
+            self._refill()
+            return max(0, int(self.tokens))
+
+
+read_bucket = TokenBucket(READ_REQUESTS_PER_MINUTE, quota='read')
+write_bucket = TokenBucket(WRITE_REQUESTS_PER_MINUTE, quota='write')
+
+
+def get_quota_remaining():
+    """Read and write requests left in the current quota window"""
+    return {
+        'read': read_bucket.remaining(),
+        'write': write_bucket.remaining()
+    }
+
+
+def is_retryable(error, write=False):
+    """Whether a failed call should be retried
+
+    A write is only retried on a 429, which Sheets rejected without applying;
+    after a 5xx or a lost connection it may already have been applied, and
+    repeating an append or row delete would do it twice, so those go back to
+    the caller.
+    """
+    if write:
+        return is_rate_limited(error)
+    if isinstance(error, gspread.exceptions.APIError):
+        return error.response.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def is_rate_limited(error):
+    """Whether an error is a Sheets 429 response"""
+    return isinstance(error, gspread.exceptions.APIError) and error.response.status_code == 429
+
+
+def call_with_backoff(bucket, func, *args, **kwargs):
+    """Call func once a quota token is free, retrying with jittered exponential backoff
+
+    Every attempt is recorded with the time spent waiting for its token.
+    Calls on the write bucket are writes, retried only when rate limited.
+    """
+    name = getattr(func, '__name__', 'call')
+    write = bucket.quota == 'write'
+    for attempt in range(MAX_RETRIES + 1):
+        wait = bucket.acquire()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            instrumentation.record('sheets', name, time.perf_counter() - start, wait,
+                                   bucket.quota, error=str(e))
+            if attempt == MAX_RETRIES or not is_retryable(e, write):
+                raise
+            time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+            continue
+        instrumentation.record('sheets', name, time.perf_counter() - start, wait, bucket.quota)
+        return result
+
+
+class RevisionTracker:
+    def __init__(self):
+        """Last modified time of each spreadsheet, shared so one Drive check serves every session"""
+        self.revisions = {}   # spreadsheet id -> (revision, monotonic time checked)
+        self.lock = threading.Lock()
+
+    def get(self, spreadsheet, max_age):
+        """The spreadsheet's Drive modifiedTime, checked at most once per max_age seconds
+
+        Returns None if Drive can't be reached, so callers can fall back to
+        expiring their caches by age.
+        """
+        with self.lock:
+            cached = self.revisions.get(spreadsheet.id)
+            if cached and time.monotonic() - cached[1] < max_age:
+                return cached[0]
+            try:
+                # A Drive metadata call; it doesn't count against the Sheets quota
+                with instrumentation.timed('drive', 'get_lastUpdateTime'):
+                    revision = spreadsheet.get_lastUpdateTime()
+            except Exception as e:
+                print(f"Error checking spreadsheet revision: {str(e)}")
+                revision = None
+            self.revisions[spreadsheet.id] = (revision, time.monotonic())
+            return revision
+
+    def clear(self):
+        with self.lock:
+            self.revisions.clear()
+
+
+def rate_limited(value):
+    """Wrap gspread clients, spreadsheets and worksheets so their calls are rate limited"""
+    if isinstance(value, (gspread.Client, gspread.Spreadsheet, gspread.Worksheet)):
+        return RateLimited(value)
+    if isinstance(value, list) and value and isinstance(value[0], gspread.Worksheet):
+        return [RateLimited(item) for item in value]
+    return value
+
+
+class RateLimited:
+    def __init__(self, target):
+        """Proxy for a gspread object that sends every API call through the quota buckets"""
+        self._target = target
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return rate_limited(value)
+
+        if name in READ_METHODS:
+            bucket = read_bucket
+        elif name in WRITE_METHODS:
+            bucket = write_bucket
+        else:
+            return value
+
+        @wraps(value)
+        def limited(*args, **kwargs):
+            return rate_limited(call_with_backoff(bucket, value, *args, **kwargs))
+        return limited
+
+    def __repr__(self):
+        return f"RateLimited({self._target!r})"